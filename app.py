@@ -2,6 +2,10 @@
 # -*- coding: utf-8 -*-
 import csv
 import copy
+import time
+import signal
+import threading
+import contextlib
 import argparse
 import itertools
 from collections import Counter
@@ -12,14 +16,27 @@ import numpy as np
 import mediapipe as mp
 
 from utils import CvFpsCalc
+from utils import QualityController
+from utils import IdleController
+from utils import MjpegServer
+from utils import DisplayWindow
+from utils import MetricsRegistry, MetricsExporter
+from utils import TimedPointHistory
+from utils import GestureStore
+from utils.metrics import DEFAULT_SCORE_BUCKETS
+from utils.quality_controller import QUALITY_LEVELS
 from model import KeyPointClassifier
+from model import KeyPointKNNClassifier
 from model import PointHistoryClassifier
+from model import RemoteKeyPointClassifier
+from model import RemotePointHistoryClassifier
+from model import ModelRegistry, ReloadableClassifier
 
-from devices import SmartSwitch, SmartLed, SmartSiren
+from devices import DeviceRegistry
 from menus import Menu
 
 
-def get_args():
+def get_args(argv=None):
     parser = argparse.ArgumentParser()
 
     parser.add_argument("--device", type=int, default=0)
@@ -35,37 +52,138 @@ def get_args():
                         help='min_tracking_confidence',
                         type=int,
                         default=0.5)
+    parser.add_argument("--history_fps",
+                        help='time grid the point history is resampled to',
+                        type=float,
+                        default=30.0)
+
+    parser.add_argument("--keypoint_dataset",
+                        help='csv hand sign samples are logged to',
+                        type=str,
+                        default='model/keypoint_classifier/keypoint.csv')
+    parser.add_argument("--point_history_dataset",
+                        help='csv finger gesture samples are logged to',
+                        type=str,
+                        default='model/point_history_classifier/point_history.csv')
+
+    parser.add_argument("--devices_config",
+                        help='device registry config file',
+                        type=str,
+                        default='devices.json')
+
+    parser.add_argument("--target_fps",
+                        help='adapt quality to hold this frame rate (0: off)',
+                        type=float,
+                        default=0)
+    parser.add_argument("--quality_log",
+                        help='csv file for quality controller decisions',
+                        type=str,
+                        default=None)
+
+    parser.add_argument("--idle_after",
+                        help='seconds without a hand before idle mode (0: off)',
+                        type=float,
+                        default=0)
+    parser.add_argument("--idle_fps",
+                        help='capture rate in idle mode',
+                        type=float,
+                        default=5.0)
+    parser.add_argument("--motion_threshold",
+                        help='share of changed pixels that wakes MediaPipe '
+                        'in idle mode',
+                        type=float,
+                        default=0.005)
+
+    parser.add_argument('--headless',
+                        help='run without a window, draw only for MJPEG viewers',
+                        action='store_true')
+    parser.add_argument("--display_fps",
+                        help='window refresh and key polling rate',
+                        type=float,
+                        default=60.0)
+    parser.add_argument('--display_thread',
+                        help='refresh the window on a background thread '
+                        '(not supported by every HighGUI backend)',
+                        action='store_true')
+    parser.add_argument("--mjpeg_port",
+                        help='serve an MJPEG preview on this port (0: off)',
+                        type=int,
+                        default=0)
+    parser.add_argument("--mjpeg_fps", type=float, default=5.0)
+    parser.add_argument("--mjpeg_quality", type=int, default=70)
+    parser.add_argument("--mjpeg_scale", type=float, default=0.5)
+
+    parser.add_argument("--classifier_server",
+                        help='unix socket of a shared classifier server',
+                        type=str,
+                        default=None)
+
+    parser.add_argument("--metrics_port",
+                        help='serve Prometheus metrics on this port (0: off)',
+                        type=int,
+                        default=0)
+    parser.add_argument("--metrics_json",
+                        help='periodically write metrics to this json file',
+                        type=str,
+                        default=None)
+    parser.add_argument("--metrics_interval", type=float, default=10.0)
+
+    parser.add_argument("--gesture_store",
+                        help='keep per-frame results in memory and snapshot '
+                        'them to this npz file',
+                        type=str,
+                        default=None)
+    parser.add_argument("--gesture_store_hours", type=float, default=4.0)
+    parser.add_argument("--gesture_store_interval", type=float, default=60.0)
+
+    parser.add_argument('--use_knn_classifier',
+                        help='nearest neighbour hand sign classifier, learns '
+                        'logged samples immediately',
+                        action='store_true')
+    parser.add_argument("--knn_reject_distance", type=float, default=1.0)
+
+    parser.add_argument('--hot_reload',
+                        help='reload changed tflite models and labels while running',
+                        action='store_true')
+    parser.add_argument("--hot_reload_interval", type=float, default=2.0)
+    parser.add_argument("--hot_reload_min_accuracy",
+                        help='accuracy a reloaded model needs on logged samples',
+                        type=float,
+                        default=0.5)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     return args
 
 
-def main():
+def main(
+    args=None,
+    cap=None,
+    hands_factory=None,
+    keypoint_classifier=None,
+    display=None,
+    on_frame=None,
+    stop_event=None,
+):
+    # The optional parameters let soak_test.py run this loop with a synthetic
+    # frame source, scripted hand signs and a window stand-in
+
     # Argument parsing #################################################################
-    args = get_args()
+    if args is None:
+        args = get_args()
 
     cap_device = args.device
     cap_width = args.width
     cap_height = args.height
 
-    switch1 = SmartSwitch("Switch1", "192.168.12.151")
-    switch2 = SmartSwitch("Switch2", "192.168.12.152")
-    led = SmartLed("Led", "192.168.12.153")
-    bulb = SmartLed("Bulb", "192.168.12.154")
-    siren = SmartSwitch("Siren", "192.168.12.154")
-
-    devices = []
-    devices.append(switch1)
-    devices.append(switch2)
-    devices.append(led)
-    devices.append(siren)
-    devices.append(bulb)
+    # Devices are probed concurrently, then polled in the background
+    devices = DeviceRegistry(args.devices_config)
+    devices.start()
 
     device_names = []
     for device in devices:
         device_names.append(device.name)
-        print(device)
+        print(f"{device} ({devices.get_status(device.name)})")
 
     color_items = ["Red", "Green", "Blue"]
     power_items = ["ON", "OFF"]
@@ -86,22 +204,83 @@ def main():
     use_brect = True
 
     # Camera preparation ###############################################################
-    cap = cv.VideoCapture(cap_device)
+    if cap is None:
+        cap = cv.VideoCapture(cap_device)
     cap.set(cv.CAP_PROP_FRAME_WIDTH, cap_width)
     cap.set(cv.CAP_PROP_FRAME_HEIGHT, cap_height)
 
+    # Adaptive quality ###############################################################
+    quality_controller = None
+    if args.target_fps > 0:
+        quality_controller = QualityController(target_fps=args.target_fps,
+                                               log_path=args.quality_log)
+    quality = QUALITY_LEVELS[0] if quality_controller is None \
+        else quality_controller.settings
+
+    # Idle mode ###############################################################
+    idle_controller = None
+    if args.idle_after > 0:
+        idle_controller = IdleController(idle_after=args.idle_after,
+                                         idle_fps=args.idle_fps,
+                                         motion_threshold=args.motion_threshold)
+
     # Model load #############################################################
     mp_hands = mp.solutions.hands
-    hands = mp_hands.Hands(
-        static_image_mode=use_static_image_mode,
-        max_num_hands=1,
-        min_detection_confidence=min_detection_confidence,
-        min_tracking_confidence=min_tracking_confidence,
-    )
 
-    keypoint_classifier = KeyPointClassifier()
+    def create_hands(model_complexity):
+        if hands_factory is not None:
+            return hands_factory(model_complexity)
+        return mp_hands.Hands(
+            static_image_mode=use_static_image_mode,
+            max_num_hands=1,
+            model_complexity=model_complexity,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+
+    hands = create_hands(quality['model_complexity'])
+
+    # Local tflite models are wrapped for hot reload, which swaps model and
+    # labels in the background between frames
+    model_registry = ModelRegistry(args.hot_reload_interval) \
+        if args.hot_reload else None
+
+    if keypoint_classifier is not None:
+        pass  # Supplied by the caller
+    elif args.use_knn_classifier:
+        keypoint_classifier = KeyPointKNNClassifier(
+            dataset_path=args.keypoint_dataset,
+            reject_distance=args.knn_reject_distance)
+    elif args.classifier_server is not None:
+        keypoint_classifier = RemoteKeyPointClassifier(args.classifier_server,
+                                                       invalid_value=-1)
+    elif model_registry is not None:
+        keypoint_classifier = model_registry.register(
+            'keypoint_classifier',
+            lambda content: KeyPointClassifier(model_content=content),
+            'model/keypoint_classifier/keypoint_classifier.tflite',
+            'model/keypoint_classifier/keypoint_classifier_label.csv',
+            validation_dataset=args.keypoint_dataset,
+            min_accuracy=args.hot_reload_min_accuracy)
+    else:
+        keypoint_classifier = KeyPointClassifier()
+
+    if args.classifier_server is not None:
+        point_history_classifier = RemotePointHistoryClassifier(
+            args.classifier_server)
+    elif model_registry is not None:
+        point_history_classifier = model_registry.register(
+            'point_history_classifier',
+            lambda content: PointHistoryClassifier(model_content=content),
+            'model/point_history_classifier/point_history_classifier.tflite',
+            'model/point_history_classifier/point_history_classifier_label.csv',
+            validation_dataset=args.point_history_dataset,
+            min_accuracy=args.hot_reload_min_accuracy)
+    else:
+        point_history_classifier = PointHistoryClassifier()
 
-    point_history_classifier = PointHistoryClassifier()
+    if model_registry is not None:
+        model_registry.start()
 
     # Read labels ###########################################################
     with open('model/keypoint_classifier/keypoint_classifier_label.csv',
@@ -117,171 +296,451 @@ def main():
         point_history_classifier_labels = [
             row[0] for row in point_history_classifier_labels
         ]
+    # Samples logged in earlier runs may use ids beyond the label file
+    if isinstance(keypoint_classifier, KeyPointKNNClassifier):
+        pad_labels(keypoint_classifier_labels, keypoint_classifier.num_labels)
 
     # FPS Measurement ########################################################
     cvFpsCalc = CvFpsCalc(buffer_len=10)
 
     # Coordinate history #################################################################
+    # Timestamped, resampled to a fixed grid so dropped frames do not change
+    # what a gesture looks like to the classifier
     history_length = 16
-    point_history = deque(maxlen=history_length)
+    point_history = TimedPointHistory(history_length,
+                                      interval=1.0 / args.history_fps)
 
     # Finger gesture history ################################################
     finger_gesture_history = deque(maxlen=history_length)
 
+    # Recognition results ##################################################
+    gesture_store = None
+    if args.gesture_store is not None:
+        gesture_store = GestureStore(
+            capacity=int(args.gesture_store_hours * 3600 * 30),
+            snapshot_path=args.gesture_store,
+            snapshot_interval=args.gesture_store_interval)
+        gesture_store.start()
+
+    # Preview ##############################################################
+    headless = args.headless
+    # The window is refreshed on its own thread, keys arrive through a queue
+    if display is None and not headless:
+        display = DisplayWindow(fps=args.display_fps,
+                                threaded=args.display_thread)
+        display.start()
+
+    mjpeg_server = None
+    if args.mjpeg_port > 0:
+        mjpeg_server = MjpegServer(port=args.mjpeg_port,
+                                   fps=args.mjpeg_fps,
+                                   quality=args.mjpeg_quality,
+                                   scale=args.mjpeg_scale)
+        mjpeg_server.start()
+
+    # Metrics ################################################################
+    metrics = MetricsRegistry()
+    frames_processed = metrics.counter(
+        'frames_processed_total', 'Frames run through the recognition loop')
+    frames_dropped = metrics.counter(
+        'frames_dropped_total', 'Frames not (fully) processed', ('reason',))
+    hands_detected = metrics.counter(
+        'hands_detected_total', 'Hands found by MediaPipe')
+    stage_latency = metrics.histogram(
+        'stage_latency_ms', 'Latency of each loop stage in ms',
+        label_names=('stage',))
+    gesture_counts = metrics.counter(
+        'gestures_total', 'Classifications per label', ('classifier', 'label'))
+    classifier_scores = metrics.histogram(
+        'classifier_score', 'Top score of each classification',
+        buckets=DEFAULT_SCORE_BUCKETS, label_names=('classifier',))
+    device_commands = metrics.counter(
+        'device_commands_total', 'Device commands sent',
+        ('device', 'action', 'outcome'))
+    fps_gauge = metrics.gauge('fps', 'Frame rate measured by CvFpsCalc')
+    idle_gauge = metrics.gauge('idle', '1 while in idle mode')
+    idle_transitions = metrics.counter(
+        'idle_transitions_total', 'Switches between active and idle mode',
+        ('state',))
+    cpu_usage = metrics.gauge(
+        'cpu_usage_ratio',
+        'Process CPU time of all threads per wall time in each mode',
+        ('state',))
+    display_latency = metrics.gauge(
+        'display_latency_ms', 'Capture to window delay of the last frame shown')
+    classifier_errors = metrics.counter(
+        'classifier_errors_total',
+        'Requests the classifier server did not answer', ('classifier',))
+    remote_classifiers = [
+        (name, classifier) for name, classifier in (
+            ('keypoint', keypoint_classifier),
+            ('point_history', point_history_classifier))
+        if isinstance(classifier, (RemoteKeyPointClassifier,
+                                   RemotePointHistoryClassifier))
+    ]
+
+    metrics_exporter = None
+    if args.metrics_port > 0 or args.metrics_json is not None:
+        metrics_exporter = MetricsExporter(metrics,
+                                           port=args.metrics_port,
+                                           json_path=args.metrics_json,
+                                           interval=args.metrics_interval)
+        metrics_exporter.start()
+
+    @contextlib.contextmanager
+    def stage(name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            stage_latency.observe(elapsed_ms, name)
+            if quality_controller is not None:
+                quality_controller.record(name, elapsed_ms)
+
+    # Without a window there is no ESC key, stop cleanly on Ctrl+C / SIGTERM
+    if stop_event is None:
+        stop_event = threading.Event()
+    # Handlers can only be installed from the main thread, an embedding
+    # caller on another thread stops the loop through stop_event
+    previous_handlers = {}
+    if headless and threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous_handlers[signum] = signal.signal(
+                signum, lambda *_: stop_event.set())
+
     #  ########################################################################
     mode = 0
-
-    while True:
-        fps = cvFpsCalc.get()
-
-        # Process Key (ESC: end) #################################################
-        key = cv.waitKey(10)
-        if key == 27:  # ESC
-            break
-        number, mode = select_mode(key, mode)
-
-        # Camera capture #####################################################
-        ret, image = cap.read()
-        if not ret:
-            break
-        image = cv.flip(image, 1)  # Mirror display
-        debug_image = copy.deepcopy(image)
-
-        # Detection implementation #############################################################
-        image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
-
-        image.flags.writeable = False
-        results = hands.process(image)
-        image.flags.writeable = True
-
-        #  ####################################################################
-        if results.multi_hand_landmarks is not None:
-            for hand_landmarks, handedness in zip(results.multi_hand_landmarks,
-                                                  results.multi_handedness):
-                # Bounding box calculation
-                brect = calc_bounding_rect(debug_image, hand_landmarks)
-                # Landmark calculation
-                landmark_list = calc_landmark_list(debug_image, hand_landmarks)
-
-                # Conversion to relative coordinates / normalized coordinates
-                pre_processed_landmark_list = pre_process_landmark(
-                    landmark_list)
-                pre_processed_point_history_list = pre_process_point_history(
-                    debug_image, point_history)
-                # Write to the dataset file
-                logging_csv(number, mode, pre_processed_landmark_list,
-                            pre_processed_point_history_list)
-
-                # Hand sign classification
-                hand_sign_index = keypoint_classifier(
-                    pre_processed_landmark_list)
-                if hand_sign_index == 2:  # Point gesture
-                    # devices menu visibility
-                    devices_menu.visibility = True
-                    point_history.append(landmark_list[8])
-                else:
-                    point_history.append([0, 0])
-
-                if hand_sign_index == 3 and hand_sign_index != last_hand_sign_index:  # OK gesture
-                    # Reset selected device index
-                    menus[selected_menu_index].visibility = False
-                    menus[selected_menu_index].selected_index = 0
-                    selected_menu_index -= 1
-                    if selected_menu_index < 0:
-                        selected_menu_index = 0
-
-                elif hand_sign_index == 4 and last_hand_sign_index != hand_sign_index:  # Thumb up gesture
-                    if ((sub_actions_menu.visibility)):
-                        if (sub_actions_menu.items[sub_actions_menu.selected_index] == "ON"):
-                            devices[devices_menu.selected_index].send_power_req(
-                                "ON")
-                        if (sub_actions_menu.items[sub_actions_menu.selected_index] == "OFF"):
-                            devices[devices_menu.selected_index].send_power_req(
-                                "OFF")
-                        if (sub_actions_menu.items[sub_actions_menu.selected_index] == "Red"):
-                            devices[devices_menu.selected_index].send_color_req(
-                                "#FF0000")
-                        if (sub_actions_menu.items[sub_actions_menu.selected_index] == "Green"):
-                            devices[devices_menu.selected_index].send_color_req(
-                                "#00FF00")
-                        if (sub_actions_menu.items[sub_actions_menu.selected_index] == "Blue"):
-                            devices[devices_menu.selected_index].send_color_req(
-                                "#0000FF")
-
-                elif hand_sign_index == 5 and last_hand_sign_index != hand_sign_index:  # Thumb down gesture
-                    if (devices_menu.visibility):
-                        print("Action negative")
-
-                elif hand_sign_index == 6 and last_hand_sign_index != hand_sign_index:  # Peace sign gesture
-                    selected_menu_index += 1
-                    if selected_menu_index >= len(menus):
-                        selected_menu_index = len(menus) - 1
-                    menus[selected_menu_index].visibility = True
-
-                last_hand_sign_index = hand_sign_index
-                # Finger gesture classification
-                finger_gesture_id = 0
-                point_history_len = len(pre_processed_point_history_list)
-                if point_history_len == (history_length * 2):
-                    finger_gesture_id = point_history_classifier(
-                        pre_processed_point_history_list)
-
-                # Calculates the gesture IDs in the latest detection
-                finger_gesture_history.append(finger_gesture_id)
-                most_common_fg_id = Counter(
-                    finger_gesture_history).most_common()
-                if (most_common_fg_id[0][0] != last_gesture_index):
-                    last_gesture_index = most_common_fg_id[0][0]
-
-                    if (selected_menu_index == 0):  # devices menu
-                        actions_menu.items = devices[devices_menu.selected_index].actions
-
-                    if (selected_menu_index == 1):  # actions menu
-                        if (actions_menu.items[actions_menu.selected_index] == "Color"):
-                            sub_actions_menu.items = color_items
-                            sub_actions_menu.name = "Color"
-                        if (actions_menu.items[actions_menu.selected_index] == "Power"):
-                            sub_actions_menu.items = power_items
-                            sub_actions_menu.name = "Power"
-
-                    if (last_gesture_index == 1):  # select next menu item
-                        menus[selected_menu_index].increaseIndex()
-                    elif (last_gesture_index == 2):  # select prev menu item
-                        menus[selected_menu_index].decreaseIndex()
-
-                # Drawing part
-                debug_image = draw_bounding_rect(use_brect, debug_image, brect)
-                debug_image = draw_landmarks(debug_image, landmark_list)
-                debug_image = draw_info_text(
-                    debug_image,
-                    brect,
-                    handedness,
-                    keypoint_classifier_labels[hand_sign_index],
-                    point_history_classifier_labels[most_common_fg_id[0][0]],
-                )
-
-        else:
-            point_history.append([0, 0])
-
-        debug_image = draw_point_history(debug_image, point_history)
-        debug_image = draw_info(debug_image, fps, mode, number)
-
-        # draw menus
-        if (devices_menu.visibility):
-            debug_image = draw_devices_menu(
-                debug_image, devices_menu.selected_index, devices_menu, is_active=selected_menu_index == 0)
-            if (actions_menu.visibility):
-                debug_image = draw_device_actions_menu(
-                    debug_image, actions_menu.selected_index, actions_menu, is_active=selected_menu_index == 1)
-                if (sub_actions_menu.visibility):
-                    debug_image = draw_sub_actions_menu(
-                        debug_image, sub_actions_menu.selected_index, sub_actions_menu, is_active=selected_menu_index == 2)
-
-        # Screen reflection #############################################################
-        cv.imshow('Hand Gesture Recognition', debug_image)
-
-    cap.release()
-    cv.destroyAllWindows()
+    frame_index = 0
+    point_history_active = (point_history_classifier, None)
+    results = None
+    # (brect, landmark_list, handedness, hand sign, finger gesture) of every
+    # hand in the latest detection, redrawn on frames without inference
+    hand_overlays = []
+
+    # Background workers are stopped and the gesture store is written even
+    # when the loop raises
+    try:
+        while not stop_event.is_set():
+            if on_frame is not None:
+                on_frame(frame_index)
+
+            fps = cvFpsCalc.get()
+            fps_gauge.set(fps)
+
+            # Classifiers and labels for this frame ##############################
+            # Hot reloaded models are pinned to one (classifier, labels) pair per
+            # frame, a reload in between cannot mismatch results and labels
+            keypoint_active = keypoint_classifier.active \
+                if isinstance(keypoint_classifier, ReloadableClassifier) \
+                else (keypoint_classifier, keypoint_classifier_labels)
+            previous_point_history_model = point_history_active[0]
+            point_history_active = point_history_classifier.active \
+                if isinstance(point_history_classifier, ReloadableClassifier) \
+                else (point_history_classifier, point_history_classifier_labels)
+            keypoint_classifier_labels = keypoint_active[1]
+            point_history_classifier_labels = point_history_active[1]
+            # Gesture ids of a replaced model may not exist in the new labels
+            if point_history_active[0] is not previous_point_history_model:
+                finger_gesture_history.clear()
+
+            # Apply quality level changes between frames ########################
+            # Idle frames are slow on purpose, they do not count as load
+            if (quality_controller is not None and idle_controller is not None
+                    and idle_controller.idle):
+                quality_controller.reset_timing()
+            elif quality_controller is not None and quality_controller.end_frame():
+                new_quality = quality_controller.settings
+                if new_quality['capture_scale'] != quality['capture_scale']:
+                    cap.set(cv.CAP_PROP_FRAME_WIDTH,
+                            int(cap_width * new_quality['capture_scale']))
+                    cap.set(cv.CAP_PROP_FRAME_HEIGHT,
+                            int(cap_height * new_quality['capture_scale']))
+                    # Stored fingertip pixels belong to the old resolution
+                    point_history.clear()
+                    results = None
+                if new_quality['model_complexity'] != quality['model_complexity']:
+                    hands.close()
+                    hands = create_hands(new_quality['model_complexity'])
+                quality = new_quality
+
+            # Process Key (ESC: end) #################################################
+            # Polling never sleeps, the capture loop runs at camera rate
+            key = -1
+            if display is not None:
+                key = display.poll_key()
+                if key == 27:  # ESC
+                    break
+            number, mode = select_mode(key, mode)
+
+            # Overlays are only drawn when somebody can see them
+            draw_enabled = not headless or (mjpeg_server is not None
+                                            and mjpeg_server.has_viewers)
+
+            # Camera capture #####################################################
+            if idle_controller is not None:
+                idle_controller.throttle(stop_event, cap)
+            # Only the wait for the camera, the quality controller does not
+            # count it as work
+            with stage('capture'):
+                ret, image = cap.read()
+            if not ret:
+                frames_dropped.inc('capture')
+                break
+            frame_timestamp = time.perf_counter()
+            image = cv.flip(image, 1)  # Mirror display
+            # Detection never writes into image, so an undrawn frame can share it
+            debug_image = copy.deepcopy(image) if draw_enabled else image
+
+            # Detection implementation #############################################################
+            # Landmarks are normalized, so a downscaled inference image is fine
+            with stage('inference'):
+                run_inference = results is None or \
+                    frame_index % quality['inference_stride'] == 0
+                if not run_inference:
+                    frames_dropped.inc('inference_stride')
+                elif (idle_controller is not None and idle_controller.idle
+                      and not idle_controller.has_motion(image)):
+                    # Nothing moved, so there is still no hand to find
+                    run_inference = False
+                    frames_dropped.inc('no_motion')
+
+                if run_inference:
+                    if quality['inference_scale'] != 1.0:
+                        image = cv.resize(image, None,
+                                          fx=quality['inference_scale'],
+                                          fy=quality['inference_scale'],
+                                          interpolation=cv.INTER_AREA)
+                    image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+
+                    image.flags.writeable = False
+                    results = hands.process(image)
+                    image.flags.writeable = True
+            frame_index += 1
+            frames_processed.inc()
+
+            if idle_controller is not None:
+                if idle_controller.update(results.multi_hand_landmarks is not None):
+                    idle_controller.set_capture_rate(cap)
+                    idle_transitions.inc(idle_controller.state)
+                    for state, usage in idle_controller.cpu_usage().items():
+                        if usage is not None:
+                            cpu_usage.set(usage, state)
+                idle_gauge.set(1 if idle_controller.idle else 0)
+
+            #  ####################################################################
+            # Frames without a new detection only redraw the last overlays.
+            # Nothing is classified, logged, counted or stored twice, and the
+            # timed point history interpolates over them
+            if not run_inference:
+                pass
+            elif results.multi_hand_landmarks is not None:
+                hand_overlays = []
+                for hand_landmarks, handedness in zip(results.multi_hand_landmarks,
+                                                      results.multi_handedness):
+                    hands_detected.inc()
+                    # Bounding box calculation
+                    brect = calc_bounding_rect(debug_image, hand_landmarks)
+                    # Landmark calculation
+                    landmark_list = calc_landmark_list(debug_image, hand_landmarks)
+
+                    # Conversion to relative coordinates / normalized coordinates
+                    pre_processed_landmark_list = pre_process_landmark(
+                        landmark_list)
+                    pre_processed_point_history_list = pre_process_point_history(
+                        debug_image, point_history.resample())
+                    # Write to the dataset file
+                    logging_csv(number, mode, pre_processed_landmark_list,
+                                pre_processed_point_history_list,
+                                keypoint_csv_path=args.keypoint_dataset,
+                                point_history_csv_path=args.point_history_dataset)
+                    # The nearest neighbour classifier learns logged poses at once
+                    if args.use_knn_classifier and mode == 1 and 0 <= number <= 9:
+                        keypoint_classifier.add_sample(pre_processed_landmark_list,
+                                                       number)
+                        pad_labels(keypoint_classifier_labels, number + 1)
+
+                    # Hand sign classification
+                    with stage('keypoint_classifier'):
+                        hand_sign_index, keypoint_active = classify(
+                            keypoint_classifier, keypoint_active,
+                            pre_processed_landmark_list)
+                    keypoint_classifier_labels = keypoint_active[1]
+                    # A negative index is a rejected pose (or an unanswered
+                    # server request), it has no label and is not counted
+                    if hand_sign_index >= 0:
+                        gesture_counts.inc(
+                            'keypoint',
+                            keypoint_classifier_labels[hand_sign_index])
+                        classifier_scores.observe(
+                            keypoint_active[0].last_score, 'keypoint')
+                    if hand_sign_index == 2:  # Point gesture
+                        # devices menu visibility
+                        devices_menu.visibility = True
+                        point_history.append(landmark_list[8], frame_timestamp)
+                    else:
+                        point_history.append([0, 0], frame_timestamp)
+
+                    if hand_sign_index == 3 and hand_sign_index != last_hand_sign_index:  # OK gesture
+                        # Reset selected device index
+                        menus[selected_menu_index].visibility = False
+                        menus[selected_menu_index].selected_index = 0
+                        selected_menu_index -= 1
+                        if selected_menu_index < 0:
+                            selected_menu_index = 0
+
+                    elif hand_sign_index == 4 and last_hand_sign_index != hand_sign_index:  # Thumb up gesture
+                        if ((sub_actions_menu.visibility)):
+                            device = devices[devices_menu.selected_index]
+                            action, result = send_device_command(
+                                device,
+                                sub_actions_menu.items[sub_actions_menu.selected_index])
+                            if action is not None:
+                                device_commands.inc(device.name, action,
+                                                    'ok' if result else 'error')
+
+                    elif hand_sign_index == 5 and last_hand_sign_index != hand_sign_index:  # Thumb down gesture
+                        if (devices_menu.visibility):
+                            print("Action negative")
+
+                    elif hand_sign_index == 6 and last_hand_sign_index != hand_sign_index:  # Peace sign gesture
+                        selected_menu_index += 1
+                        if selected_menu_index >= len(menus):
+                            selected_menu_index = len(menus) - 1
+                        menus[selected_menu_index].visibility = True
+
+                    last_hand_sign_index = hand_sign_index
+                    # Finger gesture classification
+                    finger_gesture_id = 0
+                    point_history_len = len(pre_processed_point_history_list)
+                    if point_history_len == (history_length * 2):
+                        with stage('point_history_classifier'):
+                            finger_gesture_id, point_history_active = classify(
+                                point_history_classifier, point_history_active,
+                                pre_processed_point_history_list)
+                        point_history_classifier_labels = point_history_active[1]
+                        gesture_counts.inc(
+                            'point_history',
+                            point_history_classifier_labels[finger_gesture_id])
+                        classifier_scores.observe(
+                            point_history_active[0].last_score, 'point_history')
+
+                    # Calculates the gesture IDs in the latest detection
+                    finger_gesture_history.append(finger_gesture_id)
+                    most_common_fg_id = Counter(
+                        finger_gesture_history).most_common()
+                    if (most_common_fg_id[0][0] != last_gesture_index):
+                        last_gesture_index = most_common_fg_id[0][0]
+
+                        if (selected_menu_index == 0):  # devices menu
+                            actions_menu.items = devices[devices_menu.selected_index].actions
+
+                        if (selected_menu_index == 1):  # actions menu
+                            if (actions_menu.items[actions_menu.selected_index] == "Color"):
+                                sub_actions_menu.items = color_items
+                                sub_actions_menu.name = "Color"
+                            if (actions_menu.items[actions_menu.selected_index] == "Power"):
+                                sub_actions_menu.items = power_items
+                                sub_actions_menu.name = "Power"
+
+                        if (last_gesture_index == 1):  # select next menu item
+                            menus[selected_menu_index].increaseIndex()
+                        elif (last_gesture_index == 2):  # select prev menu item
+                            menus[selected_menu_index].decreaseIndex()
+
+                    # Kept in memory for later queries
+                    if gesture_store is not None and hand_sign_index >= 0:
+                        gesture_store.append(
+                            gesture_store.timestamp(frame_timestamp), handedness.classification[0].index,
+                            hand_sign_index, most_common_fg_id[0][0],
+                            keypoint_active[0].last_score,
+                            point_history_active[0].last_score
+                            if point_history_len == (history_length * 2)
+                            else np.nan,
+                            brect)
+
+                    # Drawing part
+                    hand_overlays.append((
+                        brect,
+                        landmark_list,
+                        handedness,
+                        keypoint_classifier_labels[hand_sign_index]
+                        if hand_sign_index >= 0 else '',
+                        point_history_classifier_labels[most_common_fg_id[0][0]],
+                    ))
+
+            else:
+                hand_overlays = []
+                point_history.append([0, 0], frame_timestamp)
+
+            for name, classifier in remote_classifiers:
+                new_errors = classifier.errors - classifier_errors.get(name)
+                if new_errors > 0:
+                    classifier_errors.inc(name, amount=new_errors)
+
+            if not draw_enabled:
+                continue
+
+            with stage('drawing'):
+                for brect, landmark_list, handedness, hand_sign_text, \
+                        finger_gesture_text in hand_overlays:
+                    debug_image = draw_bounding_rect(use_brect, debug_image, brect)
+                    if quality['overlay_detail'] >= 2:
+                        debug_image = draw_landmarks(debug_image, landmark_list)
+                    debug_image = draw_info_text(debug_image, brect, handedness,
+                                                 hand_sign_text,
+                                                 finger_gesture_text)
+                if quality['overlay_detail'] >= 1:
+                    debug_image = draw_point_history(debug_image,
+                                                     point_history.resample())
+                debug_image = draw_info(debug_image, fps, mode, number)
+
+                # draw menus
+                if (devices_menu.visibility):
+                    debug_image = draw_devices_menu(
+                        debug_image, devices_menu.selected_index, devices_menu, is_active=selected_menu_index == 0,
+                        statuses=devices.get_statuses())
+                    if (actions_menu.visibility):
+                        debug_image = draw_device_actions_menu(
+                            debug_image, actions_menu.selected_index, actions_menu, is_active=selected_menu_index == 1)
+                        if (sub_actions_menu.visibility):
+                            debug_image = draw_sub_actions_menu(
+                                debug_image, sub_actions_menu.selected_index, sub_actions_menu, is_active=selected_menu_index == 2)
+
+            # Screen reflection #############################################################
+            with stage('display'):
+                if mjpeg_server is not None:
+                    mjpeg_server.submit(debug_image)
+                if display is not None:
+                    display.show(debug_image, frame_timestamp)
+                    display_latency.set(display.latency_ms)
+    finally:
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+        if gesture_store is not None:
+            gesture_store.stop()
+        if mjpeg_server is not None:
+            mjpeg_server.stop()
+        if quality_controller is not None:
+            quality_controller.close()
+        hands.close()
+        if model_registry is not None:
+            model_registry.stop()
+        devices.stop()
+        cap.release()
+        if display is not None:
+            display.stop()
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+
+def send_device_command(device, item):
+    colors = {"Red": "#FF0000", "Green": "#00FF00", "Blue": "#0000FF"}
+    if item == "ON" or item == "OFF":
+        return "power", device.send_power_req(item)
+    if item in colors:
+        return "color", device.send_color_req(colors[item])
+    return None, False
 
 
 def select_mode(key, mode):
@@ -381,16 +840,32 @@ def pre_process_point_history(image, point_history):
     return temp_point_history
 
 
-def logging_csv(number, mode, landmark_list, point_history_list):
+def classify(classifier, active, features):
+    # Returns the class index and the (classifier, labels) pair it came from
+    if isinstance(classifier, ReloadableClassifier):
+        return classifier.classify(features, active)
+    return active[0](features), active
+
+
+def pad_labels(labels, count):
+    # Ids without a name in the label file are shown as the id itself
+    while len(labels) < count:
+        labels.append(str(len(labels)))
+    return labels
+
+
+def logging_csv(number, mode, landmark_list, point_history_list,
+                keypoint_csv_path='model/keypoint_classifier/keypoint.csv',
+                point_history_csv_path='model/point_history_classifier/point_history.csv'):
     if mode == 0:
         pass
     if mode == 1 and (0 <= number <= 9):
-        csv_path = 'model/keypoint_classifier/keypoint.csv'
+        csv_path = keypoint_csv_path
         with open(csv_path, 'a', newline="") as f:
             writer = csv.writer(f)
             writer.writerow([number, *landmark_list])
     if mode == 2 and (0 <= number <= 9):
-        csv_path = 'model/point_history_classifier/point_history.csv'
+        csv_path = point_history_csv_path
         with open(csv_path, 'a', newline="") as f:
             writer = csv.writer(f)
             writer.writerow([number, *point_history_list])
@@ -642,9 +1117,13 @@ def draw_info(image, fps, mode, number):
     return image
 
 
-def draw_devices_menu(image, selected_device_index, device_menu, is_active=False):
+def draw_devices_menu(image, selected_device_index, device_menu, is_active=False, statuses=None):
     text = device_menu.name + " : "
     items = device_menu.items
+    if statuses is not None:
+        # Cached state from the registry poller, no network call here
+        items = [f"{item} [{statuses[item]}]" if item in statuses else item
+                 for item in items]
     max_width = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 0.9, 1)[0][0]
     # Calculate the top left coordinate of the rectangle
     top_left = (10, 130 - cv.getTextSize(text,
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import argparse
+
+import numpy as np
+
+from utils.augmentation import KeyPointAugmenter
+from utils.augmentation import PointHistoryAugmenter
+from utils.augmentation import augment_batches
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--keypoint_dataset", type=str,
+                        default='model/keypoint_classifier/keypoint.csv')
+    parser.add_argument("--point_history_dataset", type=str,
+                        default='model/point_history_classifier/point_history.csv')
+    parser.add_argument("--batch_size", type=int, default=8192)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def load_dataset(path):
+    data = np.loadtxt(path, delimiter=',', dtype=np.float32, ndmin=2)
+    return data[:, 1:], data[:, 0].astype(np.int32)
+
+
+def measure(name, batches, batch_size, duration):
+    next(batches)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        next(batches)
+        count += batch_size
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} {count / elapsed / 1e6:.2f}M samples/s "
+          f"({elapsed / count * 1e9:.0f}ns per sample)")
+
+
+def main():
+    args = get_args()
+
+    features, labels = load_dataset(args.keypoint_dataset)
+    augmenter = KeyPointAugmenter(seed=args.seed)
+    measure('keypoint', augment_batches(features, labels, augmenter,
+                                        args.batch_size, seed=args.seed),
+            args.batch_size, args.duration)
+
+    features, labels = load_dataset(args.point_history_dataset)
+    # Stop, Clockwise, Counter Clockwise, Move
+    augmenter = PointHistoryAugmenter(mirror_label_map={1: 2, 2: 1},
+                                      seed=args.seed)
+    measure('point_history', augment_batches(features, labels, augmenter,
+                                             args.batch_size, seed=args.seed),
+            args.batch_size, args.duration)
+
+
+if __name__ == '__main__':
+    main()
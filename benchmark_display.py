@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import argparse
+
+import cv2 as cv
+import numpy as np
+
+from utils import DisplayWindow
+from utils import SyntheticFrameSource
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--duration", help='seconds per run',
+                        type=float, default=5.0)
+    parser.add_argument("--camera_fps", help='pace the synthetic source',
+                        type=float, default=30.0)
+    parser.add_argument("--work_ms", help='simulated recognition cost per frame',
+                        type=float, default=25.0)
+    parser.add_argument("--display_fps", type=float, default=60.0)
+    parser.add_argument("--width", type=int, default=960)
+    parser.add_argument("--height", type=int, default=540)
+    parser.add_argument('--simulate_highgui',
+                        help='replace imshow/waitKey by sleeps, for OpenCV '
+                        'builds without GUI support',
+                        action='store_true')
+    parser.add_argument("--imshow_ms", help='imshow cost when simulated',
+                        type=float, default=1.0)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def simulate_highgui(imshow_ms):
+    def imshow(window_name, image):
+        time.sleep(imshow_ms / 1000.0)
+
+    def wait_key(delay=0):
+        time.sleep(max(delay, 1) / 1000.0)
+        return -1
+
+    cv.imshow = imshow
+    cv.waitKey = wait_key
+    cv.destroyAllWindows = lambda: None
+
+
+def process(image, work_ms):
+    # Stands in for MediaPipe and the classifiers
+    deadline = time.perf_counter() + work_ms / 1000.0
+    while time.perf_counter() < deadline:
+        pass
+    return image.copy()
+
+
+def run_wait_key(cap, args):
+    # Previous loop: fixed 10 ms waitKey in front of every capture
+    latencies = []
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        cv.waitKey(10)
+        ret, image = cap.read()
+        timestamp = time.perf_counter()
+        debug_image = process(image, args.work_ms)
+        cv.imshow('benchmark', debug_image)
+        latencies.append((time.perf_counter() - timestamp) * 1000.0)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    cv.destroyAllWindows()
+    return frames / elapsed, latencies
+
+
+def run_display_window(cap, args, threaded):
+    display = DisplayWindow('benchmark', fps=args.display_fps,
+                            threaded=threaded)
+    display.start()
+    latencies = []
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        display.poll_key()
+        ret, image = cap.read()
+        timestamp = time.perf_counter()
+        debug_image = process(image, args.work_ms)
+        display.show(debug_image, timestamp)
+        # Only the frames the window actually refreshed with are counted
+        if display.frames_shown > len(latencies):
+            latencies.append(display.latency_ms)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    display.stop()
+    return frames / elapsed, latencies
+
+
+def report(name, fps, latencies):
+    print(f"{name:<14} fps={fps:6.1f} "
+          f"latency mean={np.mean(latencies):.1f}ms "
+          f"p95={np.percentile(latencies, 95):.1f}ms")
+    return fps
+
+
+def main():
+    args = get_args()
+
+    if args.simulate_highgui:
+        simulate_highgui(args.imshow_ms)
+
+    print(f"camera {args.camera_fps:g} fps (0: free run), "
+          f"work {args.work_ms:g} ms per frame")
+    baseline = report('waitKey(10)', *run_wait_key(
+        SyntheticFrameSource(args.width, args.height, fps=args.camera_fps),
+        args))
+    polled = report('DisplayWindow', *run_display_window(
+        SyntheticFrameSource(args.width, args.height, fps=args.camera_fps),
+        args, threaded=False))
+    threaded = report('threaded', *run_display_window(
+        SyntheticFrameSource(args.width, args.height, fps=args.camera_fps),
+        args, threaded=True))
+    print(f"fps change {(polled / baseline - 1.0) * 100.0:+.1f}% "
+          f"(threaded {(threaded / baseline - 1.0) * 100.0:+.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import argparse
+
+import numpy as np
+
+from model import KeyPointClassifier
+from model import KeyPointKNNClassifier
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--dataset", type=str,
+                        default='model/keypoint_classifier/keypoint.csv')
+    parser.add_argument("--model", type=str,
+                        default='model/keypoint_classifier/keypoint_classifier.tflite')
+    parser.add_argument("--test_ratio", type=float, default=0.25)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--reject_distance", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def measure(classifier, features, labels):
+    predictions = np.empty(len(labels), dtype=np.int64)
+    latencies = np.empty(len(labels))
+    for index, sample in enumerate(features):
+        sample = sample.tolist()
+        start = time.perf_counter()
+        predictions[index] = classifier(sample)
+        latencies[index] = (time.perf_counter() - start) * 1000.0
+    return predictions, latencies
+
+
+def report(name, predictions, latencies, labels, build_ms):
+    print(f"{name:<8} accuracy={np.mean(predictions == labels):.4f} "
+          f"p50={np.percentile(latencies, 50):.3f}ms "
+          f"p99={np.percentile(latencies, 99):.3f}ms "
+          f"build={build_ms:.1f}ms")
+
+
+def main():
+    args = get_args()
+
+    data = np.loadtxt(args.dataset, delimiter=',', dtype=np.float32, ndmin=2)
+    labels = data[:, 0].astype(np.int32)
+    features = data[:, 1:]
+
+    # Stratified split so small classes are present in both halves
+    rng = np.random.default_rng(args.seed)
+    test_mask = np.zeros(len(labels), dtype=bool)
+    for label in np.unique(labels):
+        indices = np.flatnonzero(labels == label)
+        count = max(1, int(len(indices) * args.test_ratio))
+        test_mask[rng.choice(indices, count, replace=False)] = True
+    print(f"{len(labels)} samples, {int(test_mask.sum())} held out, "
+          f"{len(np.unique(labels))} classes")
+
+    start = time.perf_counter()
+    knn = KeyPointKNNClassifier(dataset_path=None, k=args.k,
+                                reject_distance=args.reject_distance,
+                                invalid_value=-1)
+    knn.add_samples(features[~test_mask], labels[~test_mask])
+    knn_build_ms = (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    tflite = KeyPointClassifier(model_path=args.model)
+    tflite_build_ms = (time.perf_counter() - start) * 1000.0
+
+    test_features = features[test_mask]
+    test_labels = labels[test_mask]
+
+    predictions, latencies = measure(knn, test_features, test_labels)
+    report('knn', predictions, latencies, test_labels, knn_build_ms)
+    print(f"{'':<8} rejected={np.mean(predictions == -1):.4f} at "
+          f"reject_distance={args.reject_distance}")
+
+    predictions, latencies = measure(tflite, test_features, test_labels)
+    report('tflite', predictions, latencies, test_labels, tflite_build_ms)
+    print("Note: the TFLite model was probably trained on the held out rows "
+          "too, so its accuracy is optimistic.")
+
+    # Onboarding cost: one runtime sample versus retraining the MLP
+    sample = test_features[0].tolist()
+    start = time.perf_counter()
+    for _ in range(1000):
+        knn.add_sample(sample, int(test_labels[0]))
+    print(f"add_sample: {(time.perf_counter() - start) * 1000.0:.3f}us "
+          f"per sample")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import argparse
+import multiprocessing
+
+import numpy as np
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--socket", type=str,
+                        default='/tmp/hand_gesture_classifier.sock')
+    parser.add_argument("--clients", help='comma separated client counts',
+                        type=str, default='1,2,4,8,16,32')
+    parser.add_argument("--duration", help='seconds per client count',
+                        type=float, default=10.0)
+    parser.add_argument("--rate",
+                        help='requests per second per client (0: closed loop)',
+                        type=float, default=30.0)
+    parser.add_argument('--start_server',
+                        help='start a classifier server for the test',
+                        action='store_true')
+    parser.add_argument("--max_batch", type=int, default=32)
+    parser.add_argument("--max_wait_ms", type=float, default=2.0)
+    parser.add_argument('--local',
+                        help='compare with one in-process interpreter per client',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def _client(socket_path, local, duration, rate, seed, start_event,
+            results_queue):
+    # Every client alternates keypoint and point history requests, like a
+    # camera process with one hand in view
+    if local:
+        from model import KeyPointClassifier, PointHistoryClassifier
+        keypoint_classifier = KeyPointClassifier()
+        point_history_classifier = PointHistoryClassifier()
+    else:
+        from model import RemoteKeyPointClassifier
+        from model import RemotePointHistoryClassifier
+        keypoint_classifier = RemoteKeyPointClassifier(socket_path)
+        point_history_classifier = RemotePointHistoryClassifier(socket_path)
+
+    rng = np.random.default_rng(seed)
+    landmarks = rng.uniform(-1, 1, (256, 42)).astype(np.float32).tolist()
+    histories = rng.uniform(-0.1, 0.1, (256, 32)).astype(np.float32).tolist()
+
+    # Warm up (and connect) outside of the measured window
+    keypoint_classifier(landmarks[0])
+    point_history_classifier(histories[0])
+
+    start_event.wait()
+    latencies = []
+    interval = 1.0 / rate if rate > 0 else 0.0
+    start = time.perf_counter()
+    next_request = start
+    index = 0
+    while time.perf_counter() - start < duration:
+        if interval > 0:
+            delay = next_request - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_request += interval
+
+        request_start = time.perf_counter()
+        keypoint_classifier(landmarks[index % 256])
+        point_history_classifier(histories[index % 256])
+        latencies.append((time.perf_counter() - request_start) * 1000.0)
+        index += 1
+
+    # The remote classifiers answer failed requests with invalid_value
+    errors = sum(getattr(classifier, 'errors', 0)
+                 for classifier in (keypoint_classifier,
+                                    point_history_classifier))
+    results_queue.put((latencies, errors))
+
+
+def _server(socket_path, max_batch, max_wait_ms, ready_event):
+    from model.classifier_server import ClassifierServer
+    server = ClassifierServer(socket_path=socket_path, max_batch=max_batch,
+                              max_wait_ms=max_wait_ms)
+    ready_event.set()
+    server.serve_forever()
+
+
+def run(client_count, args):
+    start_event = multiprocessing.Event()
+    results_queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_client,
+                                args=(args.socket, args.local, args.duration,
+                                      args.rate, seed, start_event,
+                                      results_queue))
+        for seed in range(client_count)
+    ]
+    for process in processes:
+        process.start()
+    # Let every client finish loading before the clock starts
+    time.sleep(2.0 if args.local else 0.5)
+    start_event.set()
+
+    latencies = []
+    errors = 0
+    for _ in processes:
+        client_latencies, client_errors = results_queue.get(
+            timeout=args.duration + 60)
+        latencies.extend(client_latencies)
+        errors += client_errors
+    for process in processes:
+        process.join()
+
+    latencies = np.array(latencies)
+    # Each call is one keypoint plus one point history inference
+    return {
+        'clients': client_count,
+        'throughput': 2 * len(latencies) / args.duration,
+        'p50': np.percentile(latencies, 50),
+        'p95': np.percentile(latencies, 95),
+        'p99': np.percentile(latencies, 99),
+        'max': latencies.max(),
+        'errors': errors,
+    }
+
+
+def main():
+    args = get_args()
+
+    server_process = None
+    if args.start_server and not args.local:
+        ready_event = multiprocessing.Event()
+        server_process = multiprocessing.Process(
+            target=_server,
+            args=(args.socket, args.max_batch, args.max_wait_ms, ready_event),
+            daemon=True)
+        server_process.start()
+        ready_event.wait()
+
+    print(f"{'mode':<7} {'clients':>7} {'infer/s':>10} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for client_count in [int(count) for count in args.clients.split(',')]:
+        result = run(client_count, args)
+        print(f"{'local' if args.local else 'server':<7} "
+              f"{result['clients']:>7} {result['throughput']:>10.0f} "
+              f"{result['p50']:>8.2f} {result['p95']:>8.2f} "
+              f"{result['p99']:>8.2f} {result['max']:>8.2f} "
+              f"{result['errors']:>7}")
+
+    if server_process is not None:
+        server_process.terminate()
+        server_process.join()
+
+
+if __name__ == '__main__':
+    main()
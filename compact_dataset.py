@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import csv
+import argparse
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--dataset",
+                        help='dataset csv (label, features...)',
+                        type=str,
+                        default='model/point_history_classifier/point_history.csv')
+    parser.add_argument("--labels",
+                        help='label csv used for the balance report',
+                        type=str,
+                        default='model/point_history_classifier/point_history_classifier_label.csv')
+    parser.add_argument("--output",
+                        help='compacted dataset csv (default: <dataset>_compact.csv)',
+                        type=str,
+                        default=None)
+    parser.add_argument("--tolerance",
+                        help='samples closer than this (euclidean) are duplicates',
+                        type=float,
+                        default=0.01)
+    parser.add_argument("--max_per_class",
+                        help='randomly cap every class to this many samples (0: off)',
+                        type=int,
+                        default=0)
+    parser.add_argument('--balance',
+                        help='cap every class to the size of the smallest one',
+                        action='store_true')
+    parser.add_argument("--chunk_size",
+                        help='rows compared per block',
+                        type=int,
+                        default=1024)
+    parser.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def load_dataset(csv_path):
+    data = np.loadtxt(csv_path, delimiter=',', dtype=np.float32, ndmin=2)
+    return data[:, 0].astype(np.int32), data[:, 1:]
+
+
+def load_labels(csv_path):
+    try:
+        with open(csv_path, encoding='utf-8-sig') as f:
+            return [row[0] for row in csv.reader(f) if len(row) > 0]
+    except OSError:
+        return []
+
+
+class _KeptBlock(object):
+    # Up to chunk_size kept samples, searched with a KD-tree from scipy when
+    # installed, vectorized brute force otherwise
+    def __init__(self, features):
+        self.features = features
+        self.tree = cKDTree(features) if cKDTree is not None else None
+        self.squared_norms = np.einsum('ij,ij->i', features, features)
+
+    def has_neighbor(self, points, tolerance):
+        if len(points) == 0:
+            return np.zeros(0, dtype=bool)
+        if self.tree is not None:
+            # The upper bound is exclusive, nudge it to include tolerance
+            distances, _ = self.tree.query(
+                points, k=1,
+                distance_upper_bound=np.nextafter(tolerance, np.inf))
+            return distances <= tolerance
+        return (_squared_distances(points, self.features, self.squared_norms)
+                <= tolerance * tolerance).any(axis=1)
+
+
+def _squared_distances(points, features, squared_norms=None):
+    if squared_norms is None:
+        squared_norms = np.einsum('ij,ij->i', features, features)
+    return (np.einsum('ij,ij->i', points, points)[:, None] -
+            2.0 * points @ features.T + squared_norms[None, :])
+
+
+def deduplicate(features, tolerance, chunk_size=1024):
+    # Greedy in file order: a sample is kept unless an earlier kept sample is
+    # within tolerance, so the first occurrence of every pose survives.
+    # Each chunk is only compared with the samples kept so far, so memory
+    # stays linear even when one pose was logged thousands of times.
+    features = features.astype(np.float64)
+    keep = np.zeros(len(features), dtype=bool)
+    tolerance_sq = tolerance * tolerance
+    kept_blocks = []
+    pending = []
+
+    for start in range(0, len(features), chunk_size):
+        indices = np.arange(start, min(start + chunk_size, len(features)))
+        blocks = kept_blocks
+        if len(pending) > 0:
+            blocks = blocks + [_KeptBlock(features[pending])]
+        for block in blocks:
+            indices = indices[~block.has_neighbor(features[indices],
+                                                  tolerance)]
+            if len(indices) == 0:
+                break
+        if len(indices) == 0:
+            continue
+
+        # Greedy within the chunk among the samples left
+        close = _squared_distances(features[indices],
+                                   features[indices]) <= tolerance_sq
+        alive = np.ones(len(indices), dtype=bool)
+        for position in range(len(indices)):
+            if alive[position]:
+                alive[position + 1:] &= ~close[position, position + 1:]
+        kept = indices[alive]
+        keep[kept] = True
+
+        pending.extend(kept.tolist())
+        if len(pending) >= chunk_size:
+            kept_blocks.append(_KeptBlock(features[pending]))
+            pending = []
+    return keep
+
+
+def cap_classes(labels, keep, max_per_class, rng):
+    for label in np.unique(labels):
+        indices = np.flatnonzero(keep & (labels == label))
+        if len(indices) > max_per_class:
+            drop = rng.choice(indices, len(indices) - max_per_class,
+                              replace=False)
+            keep[drop] = False
+    return keep
+
+
+def print_report(label_names, labels, keep):
+    print(f"{'id':>3} {'label':<20} {'before':>8} {'after':>8} {'share':>7}")
+    total_after = max(int(keep.sum()), 1)
+    for label in np.unique(labels):
+        name = label_names[label] if label < len(label_names) else ''
+        before = int((labels == label).sum())
+        after = int((keep & (labels == label)).sum())
+        print(f"{label:>3} {name:<20} {before:>8} {after:>8} "
+              f"{after / total_after:>7.1%}")
+    print(f"{'':>3} {'total':<20} {len(labels):>8} {int(keep.sum()):>8}")
+
+
+def main():
+    args = get_args()
+
+    labels, features = load_dataset(args.dataset)
+    label_names = load_labels(args.labels)
+
+    keep = np.zeros(len(labels), dtype=bool)
+    for label in np.unique(labels):
+        indices = np.flatnonzero(labels == label)
+        keep[indices] = deduplicate(features[indices], args.tolerance,
+                                    args.chunk_size)
+
+    max_per_class = args.max_per_class
+    if args.balance:
+        smallest = min(int((keep & (labels == label)).sum())
+                       for label in np.unique(labels))
+        max_per_class = smallest if max_per_class == 0 else min(
+            max_per_class, smallest)
+    if max_per_class > 0:
+        keep = cap_classes(labels, keep, max_per_class,
+                           np.random.default_rng(args.seed))
+
+    print_report(label_names, labels, keep)
+
+    output = args.output
+    if output is None:
+        output = args.dataset[:-len('.csv')] + '_compact.csv' \
+            if args.dataset.endswith('.csv') else args.dataset + '_compact'
+
+    # Rows are written back untouched, in their original order
+    with open(args.dataset, newline="") as src, \
+            open(output, 'w', newline="") as dst:
+        writer = csv.writer(dst)
+        rows = (row for row in csv.reader(src) if len(row) > 0)
+        for row, kept in zip(rows, keep):
+            if kept:
+                writer.writerow(row)
+    print(f"Compacted dataset written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,8 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
 
@@ -17,6 +22,13 @@ class Device:
             print(f"Error: {e}")
             return False
 
+    def get_power_state(self, timeout=1.0):
+        # Raises on network errors, the registry records them as unreachable
+        result = requests.get(f"http://{self.ip}/cm?cmnd=POWER",
+                              timeout=timeout)
+        result.raise_for_status()
+        return result.json().get("POWER")
+
     def __str__(self):
         return f"{self.name} at {self.ip}"
 
@@ -47,3 +59,119 @@ class SmartLed(Device):
         except Exception as e:
             print(f"Error: {e}")
             return False
+
+
+DEVICE_TYPES = {
+    "Generic": Device,
+    "SmartSwitch": SmartSwitch,
+    "SmartSiren": SmartSiren,
+    "SmartLed": SmartLed,
+}
+
+
+class DeviceStatus:
+    def __init__(self, reachable=False, power=None, error=None, checked_at=0.0):
+        self.reachable = reachable
+        self.power = power
+        self.error = error
+        self.checked_at = checked_at
+
+    def __str__(self):
+        if not self.reachable:
+            return "offline"
+        return self.power if self.power is not None else "online"
+
+
+class DeviceRegistry:
+    def __init__(
+        self,
+        config_path='devices.json',
+        poll_interval=None,
+        timeout=None,
+        max_workers=None,
+    ):
+        with open(config_path, encoding='utf-8') as f:
+            config = json.load(f)
+
+        self.poll_interval = config.get("poll_interval", 5.0) \
+            if poll_interval is None else poll_interval
+        self.timeout = config.get("timeout", 1.0) \
+            if timeout is None else timeout
+        self.max_workers = config.get("max_workers", 32) \
+            if max_workers is None else max_workers
+
+        if len(config.get("devices", [])) == 0:
+            raise ValueError(f"No devices listed in {config_path}")
+
+        self.devices = []
+        for entry in config["devices"]:
+            for key in ("name", "ip"):
+                if key not in entry:
+                    raise ValueError(
+                        f"Device entry {entry} in {config_path} has no {key}")
+            device_class = DEVICE_TYPES.get(entry.get("type", "Generic"))
+            if device_class is None:
+                raise ValueError(
+                    f"Unknown device type {entry['type']} for {entry['name']}")
+            self.devices.append(device_class(entry["name"], entry["ip"]))
+
+        # The status table is replaced as a whole by the poller, so readers on
+        # the frame thread never see a half updated table and never block
+        self._statuses = {device.name: DeviceStatus()
+                          for device in self.devices}
+        self._executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, max(len(self.devices), 1)),
+            thread_name_prefix="device-probe")
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __iter__(self):
+        return iter(self.devices)
+
+    def __getitem__(self, index):
+        return self.devices[index]
+
+    def _probe(self, device):
+        try:
+            power = device.get_power_state(timeout=self.timeout)
+            return DeviceStatus(True, power, None, time.time())
+        except Exception as e:
+            return DeviceStatus(False, None, str(e), time.time())
+
+    def probe_all(self):
+        statuses = dict(zip(
+            [device.name for device in self.devices],
+            self._executor.map(self._probe, self.devices),
+        ))
+        self._statuses = statuses
+        return statuses
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.probe_all()
+
+    def start(self):
+        # Initial probe runs concurrently for all devices before returning,
+        # a poll interval of 0 disables the background poller
+        self.probe_all()
+        if self.poll_interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._poll_loop,
+                                        name="device-poller",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=False)
+
+    def get_status(self, name):
+        return self._statuses.get(name)
+
+    def get_statuses(self):
+        return self._statuses
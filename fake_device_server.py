@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from devices import DEVICE_TYPES
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--count", help='number of fake devices',
+                        type=int, default=100)
+    parser.add_argument("--host", type=str, default='127.0.0.1')
+    parser.add_argument("--base_port", type=int, default=18000)
+    parser.add_argument("--latency", help='max response delay in seconds',
+                        type=float, default=0.0)
+    parser.add_argument("--offline_ratio",
+                        help='ratio of devices that never answer',
+                        type=float, default=0.0)
+    parser.add_argument("--config", help='write a registry config to this path',
+                        type=str, default='fake_devices.json')
+
+    args = parser.parse_args()
+
+    return args
+
+
+class FakeDeviceHandler(BaseHTTPRequestHandler):
+    # Tasmota style API: /cm?cmnd=POWER [ON|OFF], /cm?cmnd=Color <value>
+    def do_GET(self):
+        server = self.server
+        if server.latency > 0:
+            server.stop_event.wait(random.uniform(0, server.latency))
+
+        url = urlparse(self.path)
+        command = parse_qs(url.query).get("cmnd", [""])[0].split(" ")
+        if url.path != "/cm" or command[0] == "":
+            self.send_error(404)
+            return
+
+        name = command[0].upper()
+        if name == "POWER":
+            if len(command) > 1:
+                server.state["POWER"] = command[1].upper()
+            body = {"POWER": server.state["POWER"]}
+        elif name == "COLOR":
+            if len(command) > 1:
+                server.state["Color"] = command[1]
+            body = {"Color": server.state["Color"]}
+        else:
+            self.send_error(400)
+            return
+
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_device(host, port, latency, stop_event):
+    server = ThreadingHTTPServer((host, port), FakeDeviceHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.stop_event = stop_event
+    server.state = {"POWER": random.choice(["ON", "OFF"]), "Color": "#FFFFFF"}
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    args = get_args()
+
+    stop_event = threading.Event()
+    device_types = list(DEVICE_TYPES.keys())
+
+    servers = []
+    entries = []
+    for index in range(args.count):
+        port = args.base_port + index
+        # Offline devices get a port nobody listens on
+        if random.random() >= args.offline_ratio:
+            servers.append(
+                start_fake_device(args.host, port, args.latency, stop_event))
+        entries.append({
+            "name": f"Fake{index}",
+            "type": device_types[index % len(device_types)],
+            "ip": f"{args.host}:{port}",
+        })
+
+    with open(args.config, 'w', encoding='utf-8') as f:
+        json.dump({"poll_interval": 5.0, "timeout": 1.0, "devices": entries},
+                  f, indent=4)
+
+    print(f"{len(servers)}/{args.count} fake devices listening on "
+          f"{args.host}:{args.base_port}-{args.base_port + args.count - 1}")
+    print(f"Registry config written to {args.config}")
+
+    try:
+        stop_event.wait()
+    except KeyboardInterrupt:
+        pass
+
+    stop_event.set()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,5 @@
 from model.keypoint_classifier.keypoint_classifier import KeyPointClassifier
-from model.point_history_classifier.point_history_classifier import PointHistoryClassifier
\ No newline at end of file
+from model.keypoint_classifier.keypoint_knn_classifier import KeyPointKNNClassifier
+from model.point_history_classifier.point_history_classifier import PointHistoryClassifier
+from model.classifier_client import RemoteKeyPointClassifier, RemotePointHistoryClassifier
+from model.model_registry import ModelRegistry, ReloadableClassifier
\ No newline at end of file
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Client side of model/classifier_server.py. Only numpy and the
+# standard library, so camera processes never load TensorFlow.
+import time
+import socket
+import struct
+
+import numpy as np
+
+DEFAULT_SOCKET_PATH = '/tmp/hand_gesture_classifier.sock'
+
+KEYPOINT_MODEL = 0
+POINT_HISTORY_MODEL = 1
+
+# Request: model id, feature count, float32 features. Response: index, score.
+_REQUEST_HEADER = struct.Struct('<BH')
+_RESPONSE = struct.Struct('<if')
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('connection closed')
+        data.extend(chunk)
+    return bytes(data)
+
+
+class _RemoteClassifier(object):
+    # Server failures never reach the caller: a request that fails returns
+    # invalid_value with a score of 0 and is counted in errors. After a
+    # failure the server is left alone for retry_interval seconds, doubled
+    # on every further failure up to max_retry_interval, so a camera process
+    # does not stall on a timeout every frame while the server is down.
+    def __init__(self, model_id, socket_path, timeout, invalid_value,
+                 retry_interval, max_retry_interval):
+        self.model_id = model_id
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.invalid_value = invalid_value
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._sock = None
+
+        # Top score of the latest call, for telemetry
+        self.last_score = 0.0
+        # Requests without an answer, including the ones skipped in backoff
+        self.errors = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._sock = sock
+
+    def _request(self, message):
+        # One reconnect attempt covers a restarted server
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(message)
+                return _RESPONSE.unpack(
+                    _recv_exact(self._sock, _RESPONSE.size))
+            except (ConnectionError, OSError):
+                self.close()
+                if attempt == 1:
+                    raise
+
+    def _infer(self, features):
+        # Returns (index, score), or None when the server did not answer
+        self.last_score = 0.0
+        if time.monotonic() < self._retry_at:
+            self.errors += 1
+            return None
+
+        features = np.asarray(features, dtype='<f4')
+        message = _REQUEST_HEADER.pack(self.model_id,
+                                       len(features)) + features.tobytes()
+        try:
+            index, score = self._request(message)
+        except (ConnectionError, OSError) as e:
+            self.errors += 1
+            self._backoff = self.retry_interval if self._backoff == 0.0 \
+                else min(self._backoff * 2.0, self.max_retry_interval)
+            self._retry_at = time.monotonic() + self._backoff
+            print(f"Classifier server {self.socket_path} unavailable, "
+                  f"retrying in {self._backoff:g} s: {e}")
+            return None
+        if self._backoff > 0.0:
+            print(f"Classifier server {self.socket_path} is back")
+            self._backoff = 0.0
+        if index < 0:
+            # The server is up but could not classify this input
+            self.errors += 1
+            return None
+        self.last_score = score
+        return index, score
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class RemoteKeyPointClassifier(_RemoteClassifier):
+    def __init__(
+        self,
+        socket_path=DEFAULT_SOCKET_PATH,
+        timeout=1.0,
+        invalid_value=0,
+        retry_interval=1.0,
+        max_retry_interval=30.0,
+    ):
+        super().__init__(KEYPOINT_MODEL, socket_path, timeout, invalid_value,
+                         retry_interval, max_retry_interval)
+
+    def __call__(
+        self,
+        landmark_list,
+    ):
+        result = self._infer(landmark_list)
+        if result is None:
+            return self.invalid_value
+
+        return result[0]
+
+
+class RemotePointHistoryClassifier(_RemoteClassifier):
+    def __init__(
+        self,
+        socket_path=DEFAULT_SOCKET_PATH,
+        score_th=0.5,
+        invalid_value=0,
+        timeout=1.0,
+        retry_interval=1.0,
+        max_retry_interval=30.0,
+    ):
+        super().__init__(POINT_HISTORY_MODEL, socket_path, timeout,
+                         invalid_value, retry_interval, max_retry_interval)
+        self.score_th = score_th
+
+    def __call__(
+        self,
+        point_history,
+    ):
+        result = self._infer(point_history)
+        if result is None:
+            return self.invalid_value
+
+        result_index, score = result
+        if score < self.score_th:
+            result_index = self.invalid_value
+
+        return result_index
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import time
+import queue
+import argparse
+import threading
+import socketserver
+
+import numpy as np
+
+from model.classifier_client import DEFAULT_SOCKET_PATH
+from model.classifier_client import KEYPOINT_MODEL, POINT_HISTORY_MODEL
+from model.classifier_client import _REQUEST_HEADER, _RESPONSE, _recv_exact
+
+
+class _Pending(object):
+    def __init__(self, features):
+        self.features = features
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Batcher(object):
+    def __init__(self, model_path, num_threads, max_batch, max_wait):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        # One interpreter per power of two batch size, so a batch never
+        # pays for a tensor reallocation
+        self._interpreters = {}
+        self.feature_len = int(
+            self._interpreter(1)[0].get_input_details()[0]['shape'][1])
+
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _interpreter(self, batch_size):
+        if batch_size not in self._interpreters:
+            # Imported here so that importing the model package (and the
+            # remote clients) does not load TensorFlow
+            import tensorflow as tf
+            interpreter = tf.lite.Interpreter(model_path=self.model_path,
+                                              num_threads=self.num_threads)
+            input_index = interpreter.get_input_details()[0]['index']
+            if batch_size != 1:
+                interpreter.resize_tensor_input(
+                    input_index, [batch_size, self.feature_len])
+            interpreter.allocate_tensors()
+            output_index = interpreter.get_output_details()[0]['index']
+            self._interpreters[batch_size] = (interpreter, input_index,
+                                              output_index)
+        return self._interpreters[batch_size]
+
+    def submit(self, features):
+        pending = _Pending(features)
+        self._queue.put(pending)
+        return pending
+
+    def _collect(self):
+        # Wait for stragglers until the deadline of the first request, after
+        # that only take what is already queued
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                bucket = 1
+                while bucket < len(batch):
+                    bucket *= 2
+                interpreter, input_index, output_index = \
+                    self._interpreter(bucket)
+
+                inputs = np.zeros((bucket, self.feature_len), dtype=np.float32)
+                for row, pending in enumerate(batch):
+                    inputs[row] = pending.features
+                interpreter.set_tensor(input_index, inputs)
+                interpreter.invoke()
+                outputs = interpreter.get_tensor(output_index)
+
+                indices = np.argmax(outputs, axis=1)
+                for row, pending in enumerate(batch):
+                    pending.result = (int(indices[row]),
+                                      float(outputs[row, indices[row]]))
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            for pending in batch:
+                pending.event.set()
+
+            self.batches += 1
+            self.requests += len(batch)
+
+
+class _ClassifierRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        batchers = self.server.batchers
+        sock = self.request
+        try:
+            while True:
+                model_id, count = _REQUEST_HEADER.unpack(
+                    _recv_exact(sock, _REQUEST_HEADER.size))
+                features = np.frombuffer(_recv_exact(sock, count * 4),
+                                         dtype='<f4')
+
+                batcher = batchers.get(model_id)
+                if batcher is None or count != batcher.feature_len:
+                    sock.sendall(_RESPONSE.pack(-1, 0.0))
+                    continue
+
+                pending = batcher.submit(features)
+                pending.event.wait()
+                if pending.error is not None:
+                    sock.sendall(_RESPONSE.pack(-1, 0.0))
+                else:
+                    sock.sendall(_RESPONSE.pack(*pending.result))
+        except ConnectionError:
+            pass
+
+
+class ClassifierServer(socketserver.ThreadingMixIn,
+                       socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Many camera processes may connect at once
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        socket_path=DEFAULT_SOCKET_PATH,
+        keypoint_model_path='model/keypoint_classifier/keypoint_classifier.tflite',
+        point_history_model_path='model/point_history_classifier/point_history_classifier.tflite',
+        num_threads=1,
+        max_batch=32,
+        max_wait_ms=2.0,
+    ):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.socket_path = socket_path
+        self.batchers = {
+            KEYPOINT_MODEL: _Batcher(keypoint_model_path, num_threads,
+                                     max_batch, max_wait_ms / 1000.0),
+            POINT_HISTORY_MODEL: _Batcher(point_history_model_path,
+                                          num_threads, max_batch,
+                                          max_wait_ms / 1000.0),
+        }
+        super().__init__(socket_path, _ClassifierRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--socket", type=str, default=DEFAULT_SOCKET_PATH)
+    parser.add_argument("--num_threads", type=int, default=1)
+    parser.add_argument("--max_batch", type=int, default=32)
+    parser.add_argument("--max_wait_ms",
+                        help='how long the first request of a batch may wait',
+                        type=float,
+                        default=2.0)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = get_args()
+
+    server = ClassifierServer(socket_path=args.socket,
+                              num_threads=args.num_threads,
+                              max_batch=args.max_batch,
+                              max_wait_ms=args.max_wait_ms)
+    print(f"Classifier server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for name, batcher in (('keypoint', server.batchers[KEYPOINT_MODEL]),
+                              ('point history',
+                               server.batchers[POINT_HISTORY_MODEL])):
+            if batcher.batches > 0:
+                print(f"{name}: {batcher.requests} requests in "
+                      f"{batcher.batches} batches "
+                      f"({batcher.requests / batcher.batches:.2f} per batch)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import numpy as np
-import tensorflow as tf
 
 
 class KeyPointClassifier(object):
@@ -9,14 +8,26 @@ class KeyPointClassifier(object):
         self,
         model_path='model/keypoint_classifier/keypoint_classifier.tflite',
         num_threads=1,
+        model_content=None,
     ):
-        self.interpreter = tf.lite.Interpreter(model_path=model_path,
-                                               num_threads=num_threads)
+        # Imported on first use, so processes that only use the remote
+        # classifiers never load TensorFlow
+        import tensorflow as tf
+
+        if model_content is not None:
+            self.interpreter = tf.lite.Interpreter(model_content=model_content,
+                                                   num_threads=num_threads)
+        else:
+            self.interpreter = tf.lite.Interpreter(model_path=model_path,
+                                                   num_threads=num_threads)
 
         self.interpreter.allocate_tensors()
         self.input_details = self.interpreter.get_input_details()
         self.output_details = self.interpreter.get_output_details()
 
+        # Top score of the latest call, for telemetry
+        self.last_score = 0.0
+
     def __call__(
         self,
         landmark_list,
@@ -32,5 +43,6 @@ class KeyPointClassifier(object):
         result = self.interpreter.get_tensor(output_details_tensor_index)
 
         result_index = np.argmax(np.squeeze(result))
+        self.last_score = float(np.squeeze(result)[result_index])
 
         return result_index
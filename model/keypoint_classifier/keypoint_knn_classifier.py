@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+
+class KeyPointKNNClassifier(object):
+    def __init__(
+        self,
+        dataset_path='model/keypoint_classifier/keypoint.csv',
+        k=5,
+        reject_distance=1.0,
+        invalid_value=-1,
+        initial_capacity=1024,
+    ):
+        self.k = k
+        self.reject_distance = reject_distance
+        # Returned for poses farther than reject_distance from every sample,
+        # negative so it cannot be mistaken for a label
+        self.invalid_value = invalid_value
+
+        # Preallocated and grown by doubling, so add_sample never rebuilds
+        self._features = np.empty((initial_capacity, 42), dtype=np.float32)
+        self._squared_norms = np.empty(initial_capacity, dtype=np.float32)
+        self._labels = np.empty(initial_capacity, dtype=np.int32)
+        self._size = 0
+
+        self.last_score = 0.0
+        self.last_distance = 0.0
+
+        if dataset_path is not None and os.path.exists(dataset_path) \
+                and os.path.getsize(dataset_path) > 0:
+            data = np.loadtxt(dataset_path, delimiter=',', dtype=np.float32,
+                              ndmin=2)
+            self.add_samples(data[:, 1:], data[:, 0].astype(np.int32))
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def num_labels(self):
+        # One more than the highest label stored, 0 when empty
+        if self._size == 0:
+            return 0
+        return int(self._labels[:self._size].max()) + 1
+
+    def _reserve(self, size):
+        capacity = len(self._labels)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        self._features = np.resize(self._features, (capacity, 42))
+        self._squared_norms = np.resize(self._squared_norms, capacity)
+        self._labels = np.resize(self._labels, capacity)
+
+    def add_samples(self, landmark_lists, labels):
+        landmark_lists = np.asarray(landmark_lists, dtype=np.float32)
+        start = self._size
+        stop = start + len(landmark_lists)
+        self._reserve(stop)
+        self._features[start:stop] = landmark_lists
+        self._squared_norms[start:stop] = np.einsum('ij,ij->i', landmark_lists,
+                                                    landmark_lists)
+        self._labels[start:stop] = labels
+        self._size = stop
+
+    def add_sample(self, landmark_list, label):
+        self.add_samples([landmark_list], [label])
+
+    def __call__(
+        self,
+        landmark_list,
+    ):
+        if self._size == 0:
+            self.last_score = 0.0
+            return self.invalid_value
+
+        query = np.asarray(landmark_list, dtype=np.float32)
+        features = self._features[:self._size]
+
+        # ||a - b||^2 = ||a||^2 - 2ab + ||b||^2, one matrix-vector product
+        squared_distances = (self._squared_norms[:self._size] -
+                             2.0 * (features @ query) + query @ query)
+        k = min(self.k, self._size)
+        nearest = np.argpartition(squared_distances, k - 1)[:k]
+        distances = np.sqrt(np.maximum(squared_distances[nearest], 0.0))
+
+        self.last_distance = float(distances.min())
+        if self.last_distance > self.reject_distance:
+            self.last_score = 0.0
+            return self.invalid_value
+
+        # Distance weighted vote among the k nearest samples
+        votes = np.bincount(self._labels[nearest],
+                            weights=1.0 / (distances + 1e-6))
+        result_index = int(np.argmax(votes))
+        self.last_score = float(votes[result_index] / votes.sum())
+
+        return result_index
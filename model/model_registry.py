@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import csv
+import threading
+
+import numpy as np
+
+
+def read_labels(label_path):
+    with open(label_path, encoding='utf-8-sig') as f:
+        return [row[0] for row in csv.reader(f) if len(row) > 0]
+
+
+def load_validation_samples(dataset_path, count=32):
+    # Evenly spaced rows of a logged dataset, (features, expected label)
+    if dataset_path is None or not os.path.exists(dataset_path) \
+            or os.path.getsize(dataset_path) == 0:
+        return []
+    data = np.loadtxt(dataset_path, delimiter=',', dtype=np.float32, ndmin=2)
+    rows = np.linspace(0, len(data) - 1, min(count, len(data))).astype(int)
+    return [(data[row, 1:].tolist(), int(data[row, 0])) for row in rows]
+
+
+class ReloadableClassifier(object):
+    def __init__(self, name, factory, model_path, label_path,
+                 validation_samples=(), min_accuracy=0.0):
+        self.name = name
+        self.factory = factory
+        self.model_path = model_path
+        self.label_path = label_path
+        self.validation_samples = list(validation_samples)
+        self.min_accuracy = min_accuracy
+
+        # (classifier, labels) is swapped as one reference, so a frame never
+        # sees a new model with old labels or the other way round
+        # The startup model is trusted like before, reloads must validate
+        self._active = self._load(validate=False)
+        self._previous = None
+
+    @property
+    def active(self):
+        # Take this once per frame and pass it to classify(), so a reload in
+        # between cannot pair the result of one model with other labels
+        return self._active
+
+    @property
+    def labels(self):
+        return self._active[1]
+
+    @property
+    def last_score(self):
+        return self._active[0].last_score
+
+    def _load(self, validate=True):
+        # The model is read into memory instead of letting TFLite map the
+        # file, so it can be overwritten in place while it is in use
+        with open(self.model_path, 'rb') as f:
+            classifier = self.factory(f.read())
+        labels = read_labels(self.label_path)
+
+        # Warm up and validate before the model can be swapped in. Without
+        # stored samples a zero input still checks that the model runs
+        samples = self.validation_samples if validate else []
+        if len(samples) == 0 and hasattr(classifier, 'input_details'):
+            shape = classifier.input_details[0]['shape']
+            samples = [([0.0] * int(shape[-1]), None)]
+        correct = 0
+        for features, expected in samples:
+            result = classifier(features)
+            if validate and not 0 <= result < len(labels):
+                raise ValueError(f"{self.name}: class {result} has no label")
+            correct += int(result == expected)
+        if len(samples) > 0 and samples[0][1] is not None:
+            accuracy = correct / len(samples)
+            if accuracy < self.min_accuracy:
+                raise ValueError(f"{self.name}: validation accuracy "
+                                 f"{accuracy:.2f} < {self.min_accuracy:.2f}")
+        return classifier, labels
+
+    def reload(self):
+        try:
+            active = self._load()
+        except Exception as e:
+            print(f"Reload of {self.name} failed, keeping current model: {e}")
+            return False
+        self._previous = self._active
+        self._active = active
+        print(f"Reloaded {self.name} from {self.model_path}")
+        return True
+
+    def __call__(self, features):
+        return self.classify(features)[0]
+
+    def classify(self, features, active=None):
+        # Returns the class index and the (classifier, labels) pair that
+        # produced it, which is the previous pair after a rollback
+        active = self._active if active is None else active
+        try:
+            return active[0](features), active
+        except Exception as e:
+            if self._previous is None or self._active is not active:
+                raise
+            print(f"{self.name} failed after reload, rolling back: {e}")
+            self._active, self._previous = self._previous, None
+            return self._active[0](features), self._active
+
+
+class ModelRegistry(object):
+    def __init__(self, poll_interval=2.0):
+        self.poll_interval = poll_interval
+        self._entries = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def register(self, name, factory, model_path, label_path,
+                 validation_dataset=None, min_accuracy=0.0):
+        classifier = ReloadableClassifier(
+            name, factory, model_path, label_path,
+            load_validation_samples(validation_dataset), min_accuracy)
+        self._entries.append([classifier, self._stat(classifier), None])
+        return classifier
+
+    @staticmethod
+    def _stat(classifier):
+        signature = []
+        for path in (classifier.model_path, classifier.label_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def poll(self):
+        for entry in self._entries:
+            classifier, loaded, pending = entry
+            current = self._stat(classifier)
+            if current == loaded or None in current:
+                entry[2] = None
+                continue
+            # Reload only once the files stopped changing for a whole poll,
+            # so a model that is still being copied is not picked up
+            if current != pending:
+                entry[2] = current
+                continue
+            classifier.reload()
+            entry[1] = current
+            entry[2] = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.poll()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run,
+                                        name='model-registry',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
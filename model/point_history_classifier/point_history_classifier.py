@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import numpy as np
-import tensorflow as tf
 
 
 class PointHistoryClassifier(object):
@@ -11,14 +10,26 @@ class PointHistoryClassifier(object):
         score_th=0.5,
         invalid_value=0,
         num_threads=1,
+        model_content=None,
     ):
-        self.interpreter = tf.lite.Interpreter(model_path=model_path,
-                                               num_threads=num_threads)
+        # Imported on first use, so processes that only use the remote
+        # classifiers never load TensorFlow
+        import tensorflow as tf
+
+        if model_content is not None:
+            self.interpreter = tf.lite.Interpreter(model_content=model_content,
+                                                   num_threads=num_threads)
+        else:
+            self.interpreter = tf.lite.Interpreter(model_path=model_path,
+                                                   num_threads=num_threads)
 
         self.interpreter.allocate_tensors()
         self.input_details = self.interpreter.get_input_details()
         self.output_details = self.interpreter.get_output_details()
 
+        # Top score of the latest call, for telemetry
+        self.last_score = 0.0
+
         self.score_th = score_th
         self.invalid_value = invalid_value
 
@@ -37,6 +48,7 @@ class PointHistoryClassifier(object):
         result = self.interpreter.get_tensor(output_details_tensor_index)
 
         result_index = np.argmax(np.squeeze(result))
+        self.last_score = float(np.squeeze(result)[result_index])
 
         if np.squeeze(result)[result_index] < self.score_th:
             result_index = self.invalid_value
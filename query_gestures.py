@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import csv
+import time
+import argparse
+
+import numpy as np
+
+from utils import GestureStore
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--snapshot", type=str, default='gestures.npz')
+    parser.add_argument("--last", help='only look at the last N minutes',
+                        type=float, default=None)
+    parser.add_argument("--bucket", help='minutes per count bucket',
+                        type=float, default=10.0)
+    parser.add_argument("--max_gap", help='longest gap in seconds counted '
+                        'as dwell time', type=float, default=0.5)
+    parser.add_argument("--keypoint_labels", type=str,
+                        default='model/keypoint_classifier/keypoint_classifier_label.csv')
+    parser.add_argument("--point_history_labels", type=str,
+                        default='model/point_history_classifier/point_history_classifier_label.csv')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def read_labels(path):
+    with open(path, encoding='utf-8-sig') as f:
+        return [row[0] for row in csv.reader(f)]
+
+
+def label_name(labels, index):
+    return labels[index] if 0 <= index < len(labels) else str(index)
+
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+def main():
+    args = get_args()
+
+    store = GestureStore.load(args.snapshot)
+    sign_labels = read_labels(args.keypoint_labels)
+    gesture_labels = read_labels(args.point_history_labels)
+    if len(store) == 0:
+        print("No results stored")
+        return
+
+    timestamps = store.columns(names=('timestamp', ))['timestamp']
+    start = None if args.last is None else timestamps[-1] - args.last * 60
+    print(f"{len(store)} results from {format_time(timestamps[0])} "
+          f"to {format_time(timestamps[-1])}")
+
+    # Hand signs per time bucket
+    bucket_starts, counts = store.counts(
+        'sign_id', bucket=args.bucket * 60, start=start,
+        num_labels=len(sign_labels))
+    print()
+    print(f"{'':<20}" + ''.join(f"{label_name(sign_labels, index)[:10]:>11}"
+                                for index in range(counts.shape[1])))
+    for bucket_start, row in zip(bucket_starts, counts):
+        print(f"{format_time(bucket_start):<20}" +
+              ''.join(f"{count:>11}" for count in row))
+
+    # Time spent in each finger gesture and hand sign
+    print()
+    for column, labels in (('gesture_id', gesture_labels),
+                           ('sign_id', sign_labels)):
+        dwell = store.dwell_times(column, max_gap=args.max_gap, start=start,
+                                  num_labels=len(labels))
+        last_seen = store.last_seen(column)
+        for index in np.argsort(-dwell):
+            seen = format_time(last_seen[index]) \
+                if index in last_seen else 'never'
+            print(f"{label_name(labels, index):<20} "
+                  f"dwell {dwell[index]:>9.1f}s  last seen {seen}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
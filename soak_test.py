@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import json
+import math
+import time
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+import numpy as np
+import mediapipe as mp
+
+import app
+from utils import SyntheticFrameSource, LoopingVideoSource
+from model import KeyPointClassifier
+from fake_device_server import start_fake_device
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--duration", help='seconds to run',
+                        type=float, default=3600)
+    parser.add_argument("--sample_interval", help='seconds between samples',
+                        type=float, default=60)
+    parser.add_argument("--warmup", help='seconds ignored by growth checks',
+                        type=float, default=120)
+    parser.add_argument("--video", help='recorded video to replay in a loop',
+                        type=str, default=None)
+    parser.add_argument("--width", type=int, default=960)
+    parser.add_argument("--height", type=int, default=540)
+    parser.add_argument("--fps", help='pace the synthetic source (0: free run)',
+                        type=float, default=0)
+    parser.add_argument('--no_synthetic_hands',
+                        help='only use hands MediaPipe actually detects',
+                        action='store_true')
+    parser.add_argument("--fake_devices", type=int, default=5)
+    parser.add_argument("--sign_hold",
+                        help='frames each scripted hand sign is held',
+                        type=int, default=10)
+    parser.add_argument("--target_fps",
+                        help='run the quality controller (0: off)',
+                        type=float, default=30.0)
+    parser.add_argument("--idle_after",
+                        help='run the idle controller (0: off)',
+                        type=float, default=0)
+    parser.add_argument("--tracemalloc_depth", help='0 disables tracemalloc',
+                        type=int, default=1)
+    parser.add_argument("--top", help='allocators listed per sample',
+                        type=int, default=10)
+    parser.add_argument("--growth_threshold",
+                        help='relative growth flagged as a leak',
+                        type=float, default=0.05)
+    parser.add_argument("--report", type=str, default='soak_report.json')
+
+    args = parser.parse_args()
+
+    return args
+
+
+# Minimal stand-ins for the MediaPipe result protos used by app.py ############
+class _Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.z = 0.0
+
+
+class _Landmarks(object):
+    def __init__(self, points):
+        self.landmark = points
+
+
+class _Classification(object):
+    def __init__(self, label, index):
+        self.label = label
+        self.index = index
+        self.score = 1.0
+
+
+class _Handedness(object):
+    def __init__(self, label, index):
+        self.classification = [_Classification(label, index)]
+
+
+class _Results(object):
+    def __init__(self, landmarks, handedness):
+        self.multi_hand_landmarks = landmarks
+        self.multi_handedness = handedness
+
+
+class SyntheticHand(object):
+    # Open right hand in normalized image coordinates, wrist first
+    _BASE = np.array([
+        [0.50, 0.80], [0.43, 0.75], [0.38, 0.68], [0.35, 0.61], [0.32, 0.55],
+        [0.45, 0.58], [0.44, 0.49], [0.44, 0.43], [0.44, 0.38],
+        [0.50, 0.57], [0.50, 0.47], [0.50, 0.41], [0.50, 0.36],
+        [0.55, 0.58], [0.56, 0.49], [0.56, 0.44], [0.56, 0.40],
+        [0.60, 0.61], [0.62, 0.54], [0.63, 0.50], [0.64, 0.46],
+    ])
+
+    def __init__(self, seed=0):
+        self._rng = np.random.default_rng(seed)
+        self._handedness = _Handedness('Right', 1)
+
+    def __call__(self, index):
+        # Slow circular motion of the whole hand plus per-landmark jitter,
+        # so both classifiers and the point history see changing input
+        angle = index / 15.0
+        offset = np.array([0.1 * math.cos(angle), 0.1 * math.sin(angle)])
+        points = self._BASE + offset + self._rng.normal(0, 0.004,
+                                                       self._BASE.shape)
+        points = np.clip(points, 0.0, 1.0)
+        return (_Landmarks([_Point(x, y) for x, y in points]),
+                self._handedness)
+
+
+class SoakHands(object):
+    # Real MediaPipe Hands; frames without a detection get the synthetic hand
+    def __init__(self, hands, synthetic_hand):
+        self._hands = hands
+        self._synthetic_hand = synthetic_hand
+        self._index = 0
+
+    def process(self, image):
+        results = self._hands.process(image)
+        self._index += 1
+        if (results.multi_hand_landmarks is None
+                and self._synthetic_hand is not None):
+            landmarks, handedness = self._synthetic_hand(self._index)
+            results = _Results([landmarks], [handedness])
+        return results
+
+    def close(self):
+        self._hands.close()
+
+
+class ScriptedKeyPointClassifier(object):
+    # Runs the real classifier, then returns a scripted sign so the menus,
+    # the pointer history and send_device_command are driven by app.py:
+    # Pointer opens the devices menu, Peace moves to actions and to the sub
+    # actions, Thumb up sends the command and OK walks back
+    SCRIPT = (2, 6, 0, 6, 4, 0, 4, 3, 0, 3, 0, 3, 1)
+
+    def __init__(self, classifier, hold=10):
+        self._classifier = classifier
+        self._hold = hold
+        self._calls = 0
+
+    @property
+    def last_score(self):
+        return self._classifier.last_score
+
+    def __call__(self, landmark_list):
+        self._classifier(landmark_list)
+        sign = self.SCRIPT[(self._calls // self._hold) % len(self.SCRIPT)]
+        self._calls += 1
+        return sign
+
+
+class SoakDisplay(object):
+    # Window stand-in: drops frames and types keys that cycle the logging
+    # modes (n, k, h every 100 frames) and the class number
+    latency_ms = 0.0
+
+    def __init__(self):
+        self.frames_shown = 0
+        self._polls = 0
+
+    def show(self, image, timestamp=None):
+        self.frames_shown += 1
+
+    def poll_key(self):
+        index = self._polls
+        self._polls += 1
+        if index % 100 == 0:
+            return (ord('n'), ord('k'), ord('h'))[(index // 100) % 3]
+        return ord('0') + index % 10
+
+    def stop(self):
+        pass
+
+
+# Resource probes ###########################################################
+def read_rss_bytes():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return -1
+
+
+def count_open_files():
+    try:
+        import psutil
+        process = psutil.Process()
+        return process.num_fds() if hasattr(process, 'num_fds') \
+            else process.num_handles()
+    except ImportError:
+        pass
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+
+
+def top_allocators(baseline, limit):
+    # Largest growth since the baseline first, or largest users without one
+    snapshot = take_snapshot()
+    if baseline is not None:
+        stats = sorted(snapshot.compare_to(baseline, 'lineno'),
+                       key=lambda stat: stat.size_diff, reverse=True)
+    else:
+        stats = snapshot.statistics('lineno')
+    top = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        top.append({
+            'location': f"{frame.filename}:{frame.lineno}",
+            'size': stat.size,
+            'size_diff': getattr(stat, 'size_diff', 0),
+            'count': stat.count,
+        })
+    return snapshot, top
+
+
+def detect_growth(samples, key, threshold):
+    values = np.array([sample[key] for sample in samples], dtype=np.float64)
+    if len(values) < 3 or np.any(values < 0):
+        return None
+    steps = np.diff(values)
+    relative = (values[-1] - values[0]) / max(abs(values[0]), 1e-9)
+    times = np.array([sample['elapsed'] for sample in samples])
+    slope = np.polyfit(times, values, 1)[0]
+    # Monotonic: almost every step goes up (or stays), and it adds up
+    non_decreasing = float(np.mean(steps >= 0))
+    flagged = bool(relative > threshold and slope > 0
+                   and non_decreasing >= 0.8 and np.any(steps > 0))
+    return {
+        'metric': key,
+        'first': float(values[0]),
+        'last': float(values[-1]),
+        'relative_growth': round(float(relative), 4),
+        'slope_per_hour': float(slope * 3600.0),
+        'non_decreasing_steps': round(non_decreasing, 3),
+        'flagged': flagged,
+    }
+
+
+# Fake devices ##############################################################
+def start_devices(count, config_path, stop_event):
+    servers = []
+    entries = []
+    types = ['SmartSwitch', 'SmartLed', 'SmartSiren']
+    for index in range(count):
+        server = start_fake_device('127.0.0.1', 0, 0.0, stop_event)
+        servers.append(server)
+        entries.append({
+            'name': f"Soak{index}",
+            'type': types[index % len(types)],
+            'ip': f"127.0.0.1:{server.server_address[1]}",
+        })
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'poll_interval': 1.0, 'timeout': 1.0, 'devices': entries},
+                  f)
+    return servers
+
+
+def main():
+    args = get_args()
+
+    workdir = tempfile.mkdtemp(prefix='soak_')
+    paths = {
+        name: os.path.join(workdir, name)
+        for name in ('keypoint.csv', 'point_history.csv', 'devices.json',
+                     'metrics.json', 'gestures.npz')
+    }
+
+    if args.tracemalloc_depth > 0:
+        tracemalloc.start(args.tracemalloc_depth)
+
+    # app.py main loop with a synthetic source and scripted input ###########
+    if args.video is not None:
+        cap = LoopingVideoSource(args.video)
+    else:
+        cap = SyntheticFrameSource(args.width, args.height, args.fps)
+    synthetic_hand = None if args.no_synthetic_hands else SyntheticHand()
+
+    def hands_factory(model_complexity):
+        return SoakHands(mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=1,
+            model_complexity=model_complexity,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.5,
+        ), synthetic_hand)
+
+    stop_event = threading.Event()
+    servers = []
+    devices_config = 'devices.json'
+    if args.fake_devices > 0:
+        servers = start_devices(args.fake_devices, paths['devices.json'],
+                                stop_event)
+        devices_config = paths['devices.json']
+
+    app_args = app.get_args([
+        '--width', str(args.width),
+        '--height', str(args.height),
+        '--devices_config', devices_config,
+        '--keypoint_dataset', paths['keypoint.csv'],
+        '--point_history_dataset', paths['point_history.csv'],
+        '--target_fps', str(args.target_fps),
+        '--idle_after', str(args.idle_after),
+        '--metrics_json', paths['metrics.json'],
+        '--metrics_interval', str(args.sample_interval),
+        '--gesture_store', paths['gestures.npz'],
+        '--gesture_store_interval', str(args.sample_interval),
+    ])
+    display = SoakDisplay()
+
+    # Sampling, called by the loop before every frame #######################
+    samples = []
+    frame_times = []
+    start = time.perf_counter()
+    state = {'baseline': None, 'top': [], 'frame_end': None,
+             'next_sample': start + args.sample_interval}
+
+    def on_frame(frame_index):
+        now = time.perf_counter()
+        if state['frame_end'] is not None:
+            frame_times.append((now - state['frame_end']) * 1000.0)
+        if now - start >= args.duration:
+            stop_event.set()
+
+        if now >= state['next_sample'] and len(frame_times) > 0:
+            state['next_sample'] = now + args.sample_interval
+            samples.append(take_sample(args, state, now - start, frame_index,
+                                       frame_times, display))
+            frame_times.clear()
+        # Sampling is excluded from the frame times
+        state['frame_end'] = time.perf_counter()
+
+    print(f"Soak test for {args.duration:.0f}s, sampling every "
+          f"{args.sample_interval:.0f}s, scratch files in {workdir}")
+
+    app.main(app_args,
+             cap=cap,
+             hands_factory=hands_factory,
+             keypoint_classifier=ScriptedKeyPointClassifier(
+                 KeyPointClassifier(), args.sign_hold),
+             display=display,
+             on_frame=on_frame,
+             stop_event=stop_event)
+
+    # Report #################################################################
+    steady = [sample for sample in samples if sample['elapsed'] >= args.warmup]
+    growth = []
+    for key in ('rss', 'heap_current', 'threads', 'open_files',
+                'frame_ms_p50', 'frame_ms_p95', 'frame_ms_p99'):
+        result = detect_growth(steady, key, args.growth_threshold)
+        if result is not None:
+            growth.append(result)
+
+    metrics = {}
+    if os.path.exists(paths['metrics.json']):
+        with open(paths['metrics.json'], encoding='utf-8') as f:
+            metrics = json.load(f)['metrics']
+
+    report = {
+        'args': vars(args),
+        'frames': samples[-1]['frames'] if len(samples) > 0 else 0,
+        'device_commands': metrics.get(
+            'hand_gesture_device_commands_total', {}),
+        'logged_csv_bytes': {
+            path: os.path.getsize(path) if os.path.exists(path) else 0
+            for path in (paths['keypoint.csv'], paths['point_history.csv'])
+        },
+        'gesture_store_bytes': os.path.getsize(paths['gestures.npz'])
+        if os.path.exists(paths['gestures.npz']) else 0,
+        'growth': growth,
+        'samples': samples,
+        'metrics': metrics,
+    }
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    for result in growth:
+        status = 'GROWING' if result['flagged'] else 'ok'
+        print(f"{result['metric']:<28} {status:<8} "
+              f"{result['first']:>14.1f} -> {result['last']:>14.1f} "
+              f"({result['relative_growth']:+.1%})")
+    print(f"Device commands {report['device_commands']}")
+    print(f"Report written to {args.report}")
+
+    stop_event.set()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def take_sample(args, state, elapsed, frame_index, frame_times, display):
+    if args.tracemalloc_depth > 0:
+        heap_current, heap_peak = tracemalloc.get_traced_memory()
+        if state['baseline'] is None and elapsed >= args.warmup:
+            state['baseline'] = take_snapshot()
+        else:
+            _, state['top'] = top_allocators(state['baseline'], args.top)
+    else:
+        heap_current, heap_peak = -1, -1
+
+    times = np.array(frame_times)
+    sample = {
+        'elapsed': round(elapsed, 1),
+        'frames': frame_index,
+        'frames_shown': display.frames_shown,
+        'rss': read_rss_bytes(),
+        'heap_current': heap_current,
+        'heap_peak': heap_peak,
+        'threads': threading.active_count(),
+        'open_files': count_open_files(),
+        'frame_ms_p50': float(np.percentile(times, 50)),
+        'frame_ms_p95': float(np.percentile(times, 95)),
+        'frame_ms_p99': float(np.percentile(times, 99)),
+        'top_allocators': state['top'],
+    }
+    print(f"[{elapsed:8.0f}s] frames={frame_index} "
+          f"rss={sample['rss'] / 2**20:.1f}MiB "
+          f"heap={heap_current / 2**20:.1f}MiB "
+          f"threads={sample['threads']} files={sample['open_files']} "
+          f"p50={sample['frame_ms_p50']:.1f}ms "
+          f"p99={sample['frame_ms_p99']:.1f}ms")
+    return sample
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,10 @@
-from utils.cvfpscalc import CvFpsCalc
\ No newline at end of file
+from utils.cvfpscalc import CvFpsCalc
+from utils.quality_controller import QualityController
+from utils.idle_controller import IdleController
+from utils.mjpeg_server import MjpegServer
+from utils.display import DisplayWindow
+from utils.frame_source import SyntheticFrameSource, LoopingVideoSource
+from utils.metrics import MetricsRegistry, MetricsExporter
+from utils.point_history import TimedPointHistory
+from utils.gesture_store import GestureStore
+from utils.augmentation import KeyPointAugmenter, PointHistoryAugmenter
\ No newline at end of file
@@ -0,0 +1,199 @@
+import numpy as np
+
+
+# Everything below works on whole batches: (N, 42) keypoint vectors and
+# (N, 32) point histories, in the preprocessed form logged by app.py.
+
+def _linear_maps(rng, count, max_degrees, mirror_prob):
+    # Per sample 2x2 map rotate(mirror(p)), shaped (N, 2, 2) to be applied
+    # to row vectors as points @ maps
+    angles = np.radians(rng.uniform(-max_degrees, max_degrees, count))
+    cos = np.cos(angles).astype(np.float32)
+    sin = np.sin(angles).astype(np.float32)
+    mirrored = rng.random(count) < mirror_prob
+    sign = np.where(mirrored, np.float32(-1.0), np.float32(1.0))
+
+    maps = np.empty((count, 2, 2), dtype=np.float32)
+    maps[:, 0, 0] = cos * sign
+    maps[:, 0, 1] = sin * sign
+    maps[:, 1, 0] = -sin
+    maps[:, 1, 1] = cos
+    return maps, mirrored
+
+
+def _swap_labels(labels, mirrored, label_map):
+    if not label_map:
+        return labels
+    lookup = np.arange(max(int(labels.max()), *label_map.keys()) + 1)
+    for source, target in label_map.items():
+        lookup[source] = target
+    return np.where(mirrored, lookup[labels], labels)
+
+
+def _jitter(rng, shape, std):
+    # Uniform noise with the requested standard deviation, several times
+    # cheaper to draw than gaussian noise
+    half_width = np.float32(std * np.sqrt(3.0))
+    noise = rng.random(shape, dtype=np.float32)
+    noise -= np.float32(0.5)
+    noise *= 2.0 * half_width
+    return noise
+
+
+class KeyPointAugmenter(object):
+    def __init__(
+        self,
+        rotation=20.0,
+        scale=0.15,
+        mirror_prob=0.5,
+        mirror_label_map=None,
+        jitter=0.01,
+        seed=None,
+    ):
+        self.rotation = rotation
+        # Uniform scaling is undone by the max-abs normalization, so only the
+        # x/y aspect is varied
+        self.scale = scale
+        self.mirror_prob = mirror_prob
+        self.mirror_label_map = mirror_label_map
+        self.jitter = jitter
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, features, labels):
+        rng = self.rng
+        count = len(features)
+        points = np.asarray(features, dtype=np.float32).reshape(count, 21, 2)
+        labels = np.asarray(labels)
+
+        maps, mirrored = _linear_maps(rng, count, self.rotation,
+                                      self.mirror_prob)
+        maps[:, :, 0] *= rng.uniform(1.0 - self.scale, 1.0 + self.scale,
+                                     (count, 1)).astype(np.float32)
+        points = np.matmul(points, maps)
+        if self.jitter > 0:
+            points += _jitter(rng, points.shape, self.jitter)
+
+        # Back to the pre_process_landmark form: wrist relative, max abs 1
+        points -= points[:, :1, :]
+        features = points.reshape(count, 42)
+        max_values = np.abs(features).max(axis=1, keepdims=True)
+        features /= np.maximum(max_values, np.float32(1e-6))
+        return features, _swap_labels(labels, mirrored, self.mirror_label_map)
+
+
+class PointHistoryAugmenter(object):
+    def __init__(
+        self,
+        rotation=20.0,
+        scale=0.2,
+        mirror_prob=None,
+        mirror_label_map=None,
+        jitter=0.002,
+        time_warp=0.3,
+        time_warp_levels=33,
+        aspect=960.0 / 540.0,
+        seed=None,
+    ):
+        # Mirroring turns clockwise into counter clockwise, so it needs the
+        # label swap, e.g. {1: 2, 2: 1} ({} when no class has a direction).
+        # Without a map it is off by default and refused when requested.
+        if mirror_prob is None:
+            mirror_prob = 0.5 if mirror_label_map is not None else 0.0
+        if mirror_prob > 0 and mirror_label_map is None:
+            raise ValueError('mirror_prob > 0 needs a mirror_label_map, '
+                             'pass {} if mirroring keeps every label')
+        self.rotation = rotation
+        self.scale = scale
+        self.mirror_prob = mirror_prob
+        self.mirror_label_map = mirror_label_map
+        self.jitter = jitter
+        self.time_warp = time_warp
+        # Coordinates are divided by image width / height, rotate in pixels
+        self.aspect = np.float32(aspect)
+        self.rng = np.random.default_rng(seed)
+        self._warp_matrices = self._build_warp_matrices(time_warp,
+                                                        time_warp_levels)
+
+    @staticmethod
+    def _build_warp_matrices(time_warp, levels, steps=16):
+        # Monotonic warps t -> t ** gamma keep both ends of the window and
+        # speed up the start or the end of the motion. Gamma is quantized so
+        # the per-sample linear interpolation becomes one batched matmul.
+        gammas = np.exp(np.linspace(-time_warp, time_warp, levels))
+        positions = (np.linspace(0.0, 1.0, steps)[None, :] **
+                     gammas[:, None]) * (steps - 1)
+        left = np.minimum(positions.astype(np.int64), steps - 2)
+        weight = positions - left
+
+        matrices = np.zeros((levels, steps, steps), dtype=np.float32)
+        level_index = np.arange(levels)[:, None]
+        step_index = np.arange(steps)[None, :]
+        matrices[level_index, step_index, left] = 1.0 - weight
+        matrices[level_index, step_index, left + 1] += weight
+        return matrices
+
+    def _warp_time(self, points):
+        levels = self.rng.integers(0, len(self._warp_matrices), len(points))
+        return np.matmul(self._warp_matrices[levels], points)
+
+    def __call__(self, features, labels):
+        rng = self.rng
+        count = len(features)
+        points = np.asarray(features, dtype=np.float32).reshape(count, 16, 2)
+        labels = np.asarray(labels)
+
+        if self.time_warp > 0:
+            points = self._warp_time(points)
+
+        maps, mirrored = _linear_maps(rng, count, self.rotation,
+                                      self.mirror_prob)
+        maps *= rng.uniform(1.0 - self.scale, 1.0 + self.scale,
+                            (count, 1, 1)).astype(np.float32)
+        # Conjugate with the aspect ratio so the rotation happens in pixels
+        maps[:, 0, 1] *= self.aspect
+        maps[:, 1, 0] /= self.aspect
+        points = np.matmul(points, maps)
+        if self.jitter > 0:
+            points += _jitter(rng, points.shape, self.jitter)
+
+        # Back to the pre_process_point_history form: relative to point 0
+        points -= points[:, :1, :]
+        return (points.reshape(count, 32),
+                _swap_labels(labels, mirrored, self.mirror_label_map))
+
+
+def augment_batches(features, labels, augmenter, batch_size=128,
+                    original_ratio=0.0, seed=None):
+    # Endless stream of augmented batches drawn from the dataset. A share of
+    # original_ratio rows per batch is passed through unchanged.
+    features = np.asarray(features, dtype=np.float32)
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+    original_count = int(batch_size * original_ratio)
+    while True:
+        indices = rng.integers(0, len(features), batch_size)
+        batch_features, batch_labels = augmenter(
+            features[indices[original_count:]],
+            labels[indices[original_count:]])
+        if original_count > 0:
+            batch_features = np.concatenate(
+                [features[indices[:original_count]], batch_features])
+            batch_labels = np.concatenate(
+                [labels[indices[:original_count]], batch_labels])
+        yield batch_features, batch_labels
+
+
+def make_tf_dataset(features, labels, augmenter, batch_size=128,
+                    original_ratio=0.0, seed=None):
+    import tensorflow as tf
+
+    feature_len = np.asarray(features).shape[1]
+    label_dtype = tf.as_dtype(np.asarray(labels).dtype)
+    return tf.data.Dataset.from_generator(
+        lambda: augment_batches(features, labels, augmenter, batch_size,
+                                original_ratio, seed),
+        output_signature=(
+            tf.TensorSpec(shape=(batch_size, feature_len), dtype=tf.float32),
+            tf.TensorSpec(shape=(batch_size, ), dtype=label_dtype),
+        ),
+    ).prefetch(tf.data.AUTOTUNE)
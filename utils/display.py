@@ -0,0 +1,99 @@
+import time
+import queue
+import threading
+
+import cv2 as cv
+
+
+class DisplayWindow(object):
+    # HighGUI window refreshed at its own rate. The recognition loop hands
+    # over frames with show() and reads key presses with poll_key(), neither
+    # of which sleeps, so capture is no longer paced by cv.waitKey.
+    # By default the window is refreshed from show() on the calling thread,
+    # at most once per refresh interval. threaded=True moves HighGUI to a
+    # background thread, which not every backend supports (Cocoa and Qt
+    # expect windows on the main thread), so it is opt-in.
+    def __init__(
+        self,
+        window_name='Hand Gesture Recognition',
+        fps=60.0,
+        threaded=False,
+    ):
+        self.window_name = window_name
+        self.interval = 1.0 / fps
+        self.threaded = threaded
+
+        self.frames_shown = 0
+        self.frames_replaced = 0
+        # Capture to screen delay of the last frame shown, in ms
+        self.latency_ms = 0.0
+
+        self._keys = queue.Queue()
+        # (image, capture timestamp) of the newest frame not shown yet
+        self._frame = None
+        self._frame_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._last_refresh = 0.0
+        self._thread = None
+
+    def start(self):
+        if self.threaded:
+            self._thread = threading.Thread(target=self._refresh_loop,
+                                            name='display', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._frame_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            cv.destroyAllWindows()
+
+    def show(self, image, timestamp=None):
+        # Only swaps a reference, frames not shown yet are replaced. The
+        # image must not be modified afterwards.
+        if self._frame is not None:
+            self.frames_replaced += 1
+        self._frame = (image, timestamp)
+        if self.threaded:
+            self._frame_event.set()
+        elif time.perf_counter() - self._last_refresh >= self.interval:
+            self._refresh()
+
+    def poll_key(self):
+        # Next key pressed since the last call, -1 when there is none
+        try:
+            return self._keys.get_nowait()
+        except queue.Empty:
+            return -1
+
+    def _refresh(self):
+        self._last_refresh = time.perf_counter()
+        frame, self._frame = self._frame, None
+        if frame is not None:
+            image, timestamp = frame
+            cv.imshow(self.window_name, image)
+            self.frames_shown += 1
+            if timestamp is not None:
+                self.latency_ms = (time.perf_counter() - timestamp) * 1000.0
+
+        # waitKey(1) both pumps window events and reads one key
+        key = cv.waitKey(1)
+        if key != -1:
+            self._keys.put(key)
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            # Wake up for a new frame, or at the refresh rate for keys
+            self._frame_event.wait(self.interval)
+            self._frame_event.clear()
+            if self._stop_event.is_set():
+                break
+            self._refresh()
+
+            delay = self._last_refresh + self.interval - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+        # HighGUI calls stay on the thread that created the window
+        cv.destroyAllWindows()
@@ -0,0 +1,107 @@
+import time
+
+import cv2 as cv
+import numpy as np
+
+
+class SyntheticFrameSource(object):
+    # Same read()/grab()/get()/set()/release() surface as cv.VideoCapture
+    def __init__(self, width=960, height=540, fps=0, seed=0):
+        self.fps = fps
+        self._rng = np.random.default_rng(seed)
+        self._index = 0
+        self._last_read = None
+        self._resize(width, height)
+
+    def _resize(self, width, height):
+        self.width = width
+        self.height = height
+        ys, xs = np.mgrid[0:height, 0:width]
+        self._background = ((xs + ys) % 256).astype(np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop_id):
+        if prop_id == cv.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        elif prop_id == cv.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        elif prop_id == cv.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def set(self, prop_id, value):
+        if prop_id == cv.CAP_PROP_FRAME_WIDTH:
+            self._resize(int(value), self.height)
+        elif prop_id == cv.CAP_PROP_FRAME_HEIGHT:
+            self._resize(self.width, int(value))
+        elif prop_id == cv.CAP_PROP_FPS:
+            self.fps = value
+        return True
+
+    def _wait(self):
+        if self.fps > 0 and self._last_read is not None:
+            delay = self._last_read + 1.0 / self.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self._last_read = time.perf_counter()
+
+    def grab(self):
+        # Skips a frame without rendering it
+        self._wait()
+        self._index += 1
+        return True
+
+    def read(self):
+        self._wait()
+
+        # Scrolling gradient plus a moving blob and a little sensor noise
+        shift = (self._index * 4) % self.width
+        gray = np.roll(self._background, shift, axis=1)
+        image = cv.merge([gray, gray, gray])
+        center = (int(self.width / 2 + self.width / 4 * np.cos(self._index / 30)),
+                  int(self.height / 2 + self.height / 4 * np.sin(self._index / 30)))
+        cv.circle(image, center, self.height // 8, (60, 120, 200), -1)
+        noise = self._rng.integers(0, 8, image.shape, dtype=np.uint8)
+        image = cv.add(image, noise)
+
+        self._index += 1
+        return True, image
+
+    def release(self):
+        pass
+
+
+class LoopingVideoSource(object):
+    # Replays a recorded video forever, rewinding at the end of the file
+    def __init__(self, path):
+        self.path = path
+        self._cap = cv.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise IOError(f"Cannot open video {path}")
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def get(self, prop_id):
+        return self._cap.get(prop_id)
+
+    def set(self, prop_id, value):
+        return self._cap.set(prop_id, value)
+
+    def grab(self):
+        if not self._cap.grab():
+            self._cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+            return self._cap.grab()
+        return True
+
+    def read(self):
+        ret, image = self._cap.read()
+        if not ret:
+            self._cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+            ret, image = self._cap.read()
+        return ret, image
+
+    def release(self):
+        self._cap.release()
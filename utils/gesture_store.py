@@ -0,0 +1,210 @@
+import os
+import time
+import threading
+
+import numpy as np
+
+
+# One row per classified hand and frame, stored column by column in
+# preallocated arrays used as a ring buffer (about 30 bytes per row, so four
+# hours at 30 fps take 13 MB). Rows are appended from the frame loop only;
+# the snapshot thread copies the columns, so a row being overwritten during
+# the copy can at worst come out torn.
+COLUMNS = (
+    ('timestamp', np.float64, ()),
+    ('hand_id', np.int8, ()),  # MediaPipe handedness index (0: Left, 1: Right)
+    ('sign_id', np.int16, ()),
+    ('gesture_id', np.int16, ()),
+    ('sign_score', np.float32, ()),  # NaN when not available
+    ('gesture_score', np.float32, ()),
+    ('brect', np.int16, (4, )),
+)
+
+
+class GestureStore(object):
+    def __init__(
+        self,
+        capacity=30 * 60 * 60 * 4,
+        snapshot_path=None,
+        snapshot_interval=60.0,
+    ):
+        self.capacity = capacity
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+
+        self._columns = {
+            name: np.zeros((capacity, ) + shape, dtype=dtype)
+            for name, dtype, shape in COLUMNS
+        }
+        # Next row to write and number of valid rows
+        self._cursor = 0
+        self._count = 0
+
+        # Queries binary search the timestamps, so they must never go back.
+        # Rows are stamped with the monotonic perf_counter, shifted once to
+        # wall clock time, instead of time.time() which NTP may step back
+        self._clock_offset = time.time() - time.perf_counter()
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return self._count
+
+    def timestamp(self, perf_counter_time=None):
+        # Wall clock seconds for a time.perf_counter() value, default now
+        if perf_counter_time is None:
+            perf_counter_time = time.perf_counter()
+        return perf_counter_time + self._clock_offset
+
+    def append(self, timestamp, hand_id, sign_id, gesture_id,
+               sign_score=np.nan, gesture_score=np.nan, brect=(0, 0, 0, 0)):
+        index = self._cursor
+        columns = self._columns
+        columns['timestamp'][index] = timestamp
+        columns['hand_id'][index] = hand_id
+        columns['sign_id'][index] = sign_id
+        columns['gesture_id'][index] = gesture_id
+        columns['sign_score'][index] = sign_score
+        columns['gesture_score'][index] = gesture_score
+        columns['brect'][index] = brect
+        self._cursor = (index + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _segments(self):
+        # Valid part of the timestamp column as two sorted views, older first
+        count, cursor = self._count, self._cursor
+        timestamps = self._columns['timestamp']
+        if count < self.capacity:
+            return timestamps[:0], timestamps[:count]
+        return timestamps[cursor:], timestamps[:cursor]
+
+    def _position(self, timestamp):
+        # Number of rows older than timestamp, by binary search
+        older, newer = self._segments()
+        position = np.searchsorted(older, timestamp)
+        if position == len(older):
+            position += np.searchsorted(newer, timestamp)
+        return int(position)
+
+    def _rows(self, name, begin, stop):
+        # Copy of logical rows [begin, stop) of one column, at most two slices
+        data = self._columns[name]
+        offset = self._cursor if self._count == self.capacity else 0
+        first = (begin + offset) % self.capacity
+        last = first + max(0, stop - begin)
+        if last <= self.capacity:
+            return data[first:last].copy()
+        return np.concatenate([data[first:], data[:last - self.capacity]])
+
+    def columns(self, start=None, end=None, hand_id=None, names=None):
+        # Copies of the columns for start <= timestamp < end, oldest first
+        count = self._count
+        begin = 0 if start is None else self._position(start)
+        stop = count if end is None else self._position(end)
+        names = [name for name, _, _ in COLUMNS] if names is None else names
+        if hand_id is None:
+            return {name: self._rows(name, begin, stop) for name in names}
+        mask = self._rows('hand_id', begin, stop) == hand_id
+        return {name: self._rows(name, begin, stop)[mask] for name in names}
+
+    # Queries ################################################################
+    def counts(self, label='sign_id', bucket=60.0, start=None, end=None,
+               num_labels=None, hand_id=None):
+        # Rows per label per time bucket. Returns bucket start times and a
+        # (buckets, labels) count matrix, widened beyond num_labels when
+        # larger ids are stored
+        rows = self.columns(start, end, hand_id, ('timestamp', label))
+        timestamps, labels = rows['timestamp'], rows[label]
+        valid = labels >= 0
+        timestamps, labels = timestamps[valid], labels[valid]
+        num_labels = max(num_labels or 0,
+                         int(labels.max()) + 1 if len(labels) > 0 else 0)
+        if len(timestamps) == 0 or num_labels == 0:
+            return np.empty(0), np.zeros((0, num_labels), dtype=np.int64)
+
+        origin = timestamps[0] if start is None else start
+        origin = np.floor(origin / bucket) * bucket
+        bucket_index = ((timestamps - origin) // bucket).astype(np.int64)
+        num_buckets = int(bucket_index[-1]) + 1
+        labels = labels.astype(np.int64)
+        matrix = np.bincount(bucket_index * num_labels + labels,
+                             minlength=num_buckets * num_labels)
+        return (origin + np.arange(num_buckets) * bucket,
+                matrix.reshape(num_buckets, num_labels))
+
+    def dwell_times(self, label='gesture_id', max_gap=0.5, start=None,
+                    end=None, num_labels=None, hand_id=None):
+        # Seconds spent in each label. Time between two consecutive rows
+        # counts when both have the same label and are at most max_gap apart,
+        # so gaps without a hand in front of the camera are not counted.
+        # Pass hand_id when more than one hand is tracked.
+        rows = self.columns(start, end, hand_id, ('timestamp', label))
+        timestamps, labels = rows['timestamp'], rows[label]
+        if num_labels is None:
+            num_labels = int(labels.max()) + 1 if len(labels) > 0 else 0
+        if len(timestamps) < 2:
+            return np.zeros(num_labels)
+
+        gaps = np.diff(timestamps)
+        same = (labels[1:] == labels[:-1]) & (gaps <= max_gap) & \
+            (labels[:-1] >= 0)
+        return np.bincount(labels[:-1][same].astype(np.int64),
+                           weights=gaps[same], minlength=num_labels)
+
+    def last_seen(self, label='sign_id', hand_id=None):
+        # Timestamp of the latest row of each label, as a dict
+        rows = self.columns(hand_id=hand_id, names=('timestamp', label))
+        timestamps, labels = rows['timestamp'], rows[label]
+        if len(labels) == 0:
+            return {}
+        # Only the last row of each run of equal labels can be the latest
+        run_ends = np.flatnonzero(np.append(labels[1:] != labels[:-1], True))
+        values, reverse_index = np.unique(labels[run_ends][::-1],
+                                          return_index=True)
+        latest = timestamps[run_ends[len(run_ends) - 1 - reverse_index]]
+        return {int(value): float(timestamp)
+                for value, timestamp in zip(values, latest)}
+
+    # Snapshots ##############################################################
+    def start(self):
+        if self.snapshot_path is not None:
+            self._thread = threading.Thread(target=self._snapshot_loop,
+                                            name='gesture-store', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.snapshot_path is not None:
+            self.snapshot()
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.snapshot_interval):
+            self.snapshot()
+
+    def snapshot(self, path=None):
+        path = self.snapshot_path if path is None else path
+        # Write then rename, so readers never see a partial file
+        temp_path = path + '.tmp.npz'
+        np.savez(temp_path, saved_at=np.float64(time.time()),
+                 **self.columns())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity=None):
+        with np.load(path) as data:
+            rows = {name: data[name] for name, _, _ in COLUMNS}
+        # Snapshots written with time.time() stamps may have gone back
+        order = np.argsort(rows['timestamp'], kind='stable')
+        rows = {name: values[order] for name, values in rows.items()}
+        count = len(rows['timestamp'])
+        store = cls(capacity=max(capacity or count, 1))
+        keep = min(count, store.capacity)
+        for name, values in rows.items():
+            store._columns[name][:keep] = values[count - keep:]
+        store._count = keep
+        store._cursor = keep % store.capacity
+        return store
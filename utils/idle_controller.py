@@ -0,0 +1,159 @@
+import time
+
+import cv2 as cv
+
+
+class IdleController(object):
+    # Power saving while nobody is in front of the camera. After idle_after
+    # seconds without a hand the loop drops to idle_fps and MediaPipe only
+    # runs on frames where a cheap downscaled frame difference sees motion.
+    # The first frame with a hand switches straight back to full rate.
+    # Call set_capture_rate(cap) on every transition: the camera itself is
+    # asked for idle_fps, so it stops capturing frames nobody reads. Drivers
+    # that refuse keep running at full rate and throttle() drains them with
+    # grab() instead of sleeping, otherwise read() would return a frame that
+    # sat in the driver buffer for the whole idle interval.
+    def __init__(
+        self,
+        idle_after=10.0,
+        idle_fps=5.0,
+        motion_width=64,
+        pixel_threshold=20,
+        motion_threshold=0.005,
+    ):
+        self.idle_after = idle_after
+        self.idle_interval = 1.0 / idle_fps
+        self.motion_width = motion_width
+        # A pixel changed when its gray level moved by more than
+        # pixel_threshold, motion when more than motion_threshold of them did
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+
+        self.idle = False
+        self.transitions = []
+        # Camera frame rate to restore on wake, and whether to drain
+        self._active_fps = None
+        self._drain = False
+        self._last_hand = time.perf_counter()
+        self._last_frame = 0.0
+        self._reference = None
+
+        # Process CPU time (all threads, so MediaPipe, display and MJPEG
+        # workers are included) and wall time spent in each state
+        self._usage = {'active': [0.0, 0.0], 'idle': [0.0, 0.0]}
+        self._last_cpu = time.process_time()
+        self._last_wall = time.perf_counter()
+
+    @property
+    def state(self):
+        return 'idle' if self.idle else 'active'
+
+    def throttle(self, stop_event=None, cap=None):
+        # Call before capture, waits out the rest of the idle frame interval
+        if self.idle:
+            deadline = self._last_frame + self.idle_interval
+            if self._drain and cap is not None:
+                # grab() blocks until the next frame, so this is paced by
+                # the camera and leaves the freshest frame for read()
+                while time.perf_counter() < deadline and not (
+                        stop_event is not None and stop_event.is_set()):
+                    if not cap.grab():
+                        break
+            else:
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    if stop_event is not None:
+                        stop_event.wait(delay)
+                    else:
+                        time.sleep(delay)
+        self._last_frame = time.perf_counter()
+
+    def set_capture_rate(self, cap):
+        # Call after a transition reported by update()
+        idle_fps = 1.0 / self.idle_interval
+        if self.idle:
+            self._active_fps = cap.get(cv.CAP_PROP_FPS)
+            accepted = cap.set(cv.CAP_PROP_FPS, idle_fps)
+            self._drain = not accepted or \
+                cap.get(cv.CAP_PROP_FPS) > idle_fps * 1.5
+        elif self._active_fps is not None:
+            cap.set(cv.CAP_PROP_FPS, self._active_fps)
+            self._active_fps = None
+            self._drain = False
+
+    def has_motion(self, image):
+        height, width = image.shape[0], image.shape[1]
+        small = cv.resize(image,
+                          (self.motion_width,
+                           max(1, height * self.motion_width // width)),
+                          interpolation=cv.INTER_AREA)
+        small = cv.cvtColor(small, cv.COLOR_BGR2GRAY)
+        small = cv.GaussianBlur(small, (5, 5), 0)
+
+        reference, self._reference = self._reference, small
+        if reference is None:
+            return True
+        diff = cv.absdiff(small, reference)
+        changed = cv.countNonZero(
+            cv.threshold(diff, self.pixel_threshold, 255,
+                         cv.THRESH_BINARY)[1])
+        return changed > self.motion_threshold * diff.size
+
+    def update(self, hand_detected):
+        # Call once per frame after detection, returns True on a transition
+        now = time.perf_counter()
+        self._account(now)
+
+        if hand_detected:
+            self._last_hand = now
+            if self.idle:
+                self._change_state(False, now)
+                return True
+        elif not self.idle and now - self._last_hand >= self.idle_after:
+            self._change_state(True, now)
+            return True
+        return False
+
+    def cpu_usage(self):
+        # Process CPU time per wall time in each state, so 1.0 is one core
+        # busy. None before any time in the state
+        return {
+            state: cpu / wall if wall > 0 else None
+            for state, (cpu, wall) in self._usage.items()
+        }
+
+    def cpu_savings(self):
+        usage = self.cpu_usage()
+        if not usage['active'] or usage['idle'] is None:
+            return None
+        return 1.0 - usage['idle'] / usage['active']
+
+    def _account(self, now):
+        cpu = time.process_time()
+        usage = self._usage[self.state]
+        usage[0] += cpu - self._last_cpu
+        usage[1] += now - self._last_wall
+        self._last_cpu = cpu
+        self._last_wall = now
+
+    def _change_state(self, idle, now):
+        self.idle = idle
+        # The next idle period starts comparing against a fresh frame
+        self._reference = None
+        usage = self.cpu_usage()
+        savings = self.cpu_savings()
+        self.transitions.append({
+            'time': time.time(),
+            'state': self.state,
+            'cpu_active': usage['active'],
+            'cpu_idle': usage['idle'],
+            'cpu_savings': savings,
+        })
+        if idle:
+            print(f"Idle: no hand for {now - self._last_hand:.1f} s, "
+                  f"processing {1.0 / self.idle_interval:g} fps "
+                  f"with motion gating")
+        else:
+            print("Active: hand detected" + (
+                f" (idle used {savings * 100.0:.0f}% less CPU)"
+                if savings is not None else ""))
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import bisect
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# Metrics are updated from the frame loop only (single writer), so updates
+# are plain dict/list operations without locks. Readers on the exporter
+# threads copy the dicts with list(), which CPython does atomically.
+
+DEFAULT_LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 33, 50, 100, 200, 500)
+DEFAULT_SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95,
+                         0.99, 1.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace(
+        '"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"'
+             for name, value in zip(label_names, label_values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if len(pairs) > 0 else ''
+
+
+class Counter(object):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        for label_values, value in list(self._values.items()):
+            yield self.name, _format_labels(self.label_names,
+                                            label_values), value
+
+    def to_dict(self):
+        return {','.join(map(str, key)): value
+                for key, value in list(self._values.items())}
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        self._values[label_values] = value
+
+
+class Histogram(object):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        state = self._values.get(label_values)
+        if state is None:
+            state = [0] * (len(self.buckets) + 1) + [0.0]
+            self._values[label_values] = state
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def samples(self):
+        for label_values, state in list(self._values.items()):
+            state = list(state)
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield (self.name + '_bucket',
+                       _format_labels(self.label_names, label_values,
+                                      ('le', repr(float(bound)))),
+                       cumulative)
+            cumulative += state[len(self.buckets)]
+            yield (self.name + '_bucket',
+                   _format_labels(self.label_names, label_values,
+                                  ('le', '+Inf')),
+                   cumulative)
+            labels = _format_labels(self.label_names, label_values)
+            yield self.name + '_sum', labels, state[-1]
+            yield self.name + '_count', labels, cumulative
+
+    def to_dict(self):
+        result = {}
+        for label_values, state in list(self._values.items()):
+            state = list(state)
+            result[','.join(map(str, label_values))] = {
+                'buckets': dict(zip([*map(str, self.buckets), '+Inf'],
+                                    state[:-1])),
+                'sum': state[-1],
+                'count': sum(state[:-1]),
+            }
+        return result
+
+
+class MetricsRegistry(object):
+    def __init__(self, prefix='hand_gesture_'):
+        self.prefix = prefix
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._add(Counter(self.prefix + name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._add(Gauge(self.prefix + name, help_text, label_names))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_LATENCY_BUCKETS,
+                  label_names=()):
+        return self._add(
+            Histogram(self.prefix + name, help_text, buckets, label_names))
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        return {
+            'timestamp': time.time(),
+            'metrics': {
+                metric.name: metric.to_dict() for metric in self._metrics
+            },
+        }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter(object):
+    def __init__(self, registry, port=0, json_path=None, interval=10.0,
+                 host='127.0.0.1'):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.json_path = json_path
+        self.interval = interval
+
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._httpd = None
+
+    def start(self):
+        if self.port > 0:
+            self._httpd = ThreadingHTTPServer((self.host, self.port),
+                                              _MetricsHandler)
+            self._httpd.daemon_threads = True
+            self._httpd.registry = self.registry
+            self._start_thread(self._httpd.serve_forever, 'metrics-http')
+            print(f"Metrics at http://{self.host}:{self.port}/metrics")
+        if self.json_path is not None:
+            self._start_thread(self._json_loop, 'metrics-json')
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _json_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.write_json()
+
+    def write_json(self):
+        # Write then rename, so readers never see a partial file
+        temp_path = self.json_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.to_dict(), f)
+        os.replace(temp_path, self.json_path)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        for thread in self._threads:
+            thread.join()
+        if self.json_path is not None:
+            self.write_json()
@@ -0,0 +1,164 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import cv2 as cv
+
+
+_INDEX_PAGE = b"""<html><head><title>Hand Gesture Recognition</title></head>
+<body style="margin:0;background:#000"><img src="/stream"></body></html>"""
+
+
+class _MjpegHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        mjpeg = self.server.mjpeg
+        if self.path == '/':
+            self._send_body(_INDEX_PAGE, 'text/html')
+        elif self.path == '/snapshot.jpg':
+            mjpeg._add_viewer()
+            try:
+                jpeg = mjpeg._wait_jpeg(mjpeg._jpeg_sequence,
+                                        timeout=5.0)[1]
+            finally:
+                mjpeg._remove_viewer()
+            if jpeg is None:
+                self.send_error(503)
+            else:
+                self._send_body(jpeg, 'image/jpeg')
+        elif self.path == '/stream':
+            self._stream(mjpeg)
+        else:
+            self.send_error(404)
+
+    def _send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, mjpeg):
+        self.send_response(200)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Type',
+                         'multipart/x-mixed-replace; boundary=frame')
+        self.end_headers()
+
+        mjpeg._add_viewer()
+        try:
+            sequence = None
+            while not mjpeg._stop_event.is_set():
+                sequence, jpeg = mjpeg._wait_jpeg(sequence, timeout=1.0)
+                if jpeg is None:
+                    continue
+                self.wfile.write(b'--frame\r\n')
+                self.wfile.write(b'Content-Type: image/jpeg\r\n')
+                self.wfile.write(
+                    f'Content-Length: {len(jpeg)}\r\n\r\n'.encode('ascii'))
+                self.wfile.write(jpeg)
+                self.wfile.write(b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            mjpeg._remove_viewer()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MjpegServer(object):
+    def __init__(
+        self,
+        host='127.0.0.1',
+        port=8080,
+        fps=5.0,
+        quality=70,
+        scale=1.0,
+    ):
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / fps
+        self.quality = quality
+        self.scale = scale
+
+        self._viewers = 0
+        self._viewers_lock = threading.Lock()
+        # Latest frame handed over by the recognition loop, replaced not queued
+        self._frame = None
+        self._jpeg = None
+        self._jpeg_sequence = 0
+        self._jpeg_condition = threading.Condition()
+        self._frame_event = threading.Event()
+        self._stop_event = threading.Event()
+
+        self._httpd = ThreadingHTTPServer((host, port), _MjpegHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mjpeg = self
+        self._threads = []
+
+    @property
+    def has_viewers(self):
+        return self._viewers > 0
+
+    def start(self):
+        for target, name in ((self._httpd.serve_forever, 'mjpeg-http'),
+                             (self._encode_loop, 'mjpeg-encoder')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"MJPEG preview at http://{self.host}:{self.port}/")
+
+    def stop(self):
+        self._stop_event.set()
+        self._frame_event.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, image):
+        # Called from the recognition loop: only swaps a reference, never
+        # encodes or waits. The image must not be modified afterwards.
+        if self._viewers > 0:
+            self._frame = image
+            self._frame_event.set()
+
+    def _encode_loop(self):
+        params = [int(cv.IMWRITE_JPEG_QUALITY), self.quality]
+        while not self._stop_event.is_set():
+            self._frame_event.wait()
+            self._frame_event.clear()
+            frame, self._frame = self._frame, None
+            if frame is None:
+                continue
+
+            if self.scale != 1.0:
+                frame = cv.resize(frame, None, fx=self.scale, fy=self.scale,
+                                  interpolation=cv.INTER_AREA)
+            ret, jpeg = cv.imencode('.jpg', frame, params)
+            if ret:
+                with self._jpeg_condition:
+                    self._jpeg = jpeg.tobytes()
+                    self._jpeg_sequence += 1
+                    self._jpeg_condition.notify_all()
+
+            # Throttle to the preview rate, frames submitted meanwhile are
+            # simply replaced by newer ones
+            self._stop_event.wait(self.interval)
+
+    def _wait_jpeg(self, last_sequence, timeout):
+        with self._jpeg_condition:
+            self._jpeg_condition.wait_for(
+                lambda: self._jpeg_sequence != last_sequence
+                and self._jpeg is not None,
+                timeout=timeout)
+            if self._jpeg_sequence == last_sequence:
+                return last_sequence, None
+            return self._jpeg_sequence, self._jpeg
+
+    def _add_viewer(self):
+        with self._viewers_lock:
+            self._viewers += 1
+
+    def _remove_viewer(self):
+        with self._viewers_lock:
+            self._viewers -= 1
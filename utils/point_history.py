@@ -0,0 +1,76 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+class TimedPointHistory(object):
+    # Point history with capture timestamps. resample() returns the history
+    # on a fixed time grid, so classifier input does not depend on the
+    # frame rate. [0, 0] marks "no fingertip", as in app.py.
+    # Samples more than max_gap seconds apart mean tracking was lost. They
+    # are not interpolated, the grid points between them are held at the
+    # closer sample for one step and marked [0, 0] beyond that. max_gap is
+    # a fixed time, not a number of grid steps, so a fingertip tracked on
+    # every frame of a slow (shedding) loop is never treated as lost.
+    def __init__(self, history_length=16, interval=1.0 / 30.0, max_points=256,
+                 max_gap=0.3, gap_tolerance=0.005):
+        self.history_length = history_length
+        self.interval = interval
+        self.max_gap = max_gap
+        # Absorbs timestamp jitter around max_gap
+        self.gap_tolerance = gap_tolerance
+        self._window = (history_length - 1) * interval
+        self._points = deque(maxlen=max_points)
+
+    def __len__(self):
+        return len(self._points)
+
+    def clear(self):
+        self._points.clear()
+
+    def append(self, point, timestamp=None):
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self._points.append((timestamp, point[0], point[1]))
+
+        # Keep the window plus one older point to interpolate the grid start
+        oldest_needed = timestamp - self._window
+        while len(self._points) > 2 and self._points[1][0] <= oldest_needed:
+            self._points.popleft()
+
+    def resample(self):
+        # Grid ends at the newest sample; grid times older than the oldest
+        # sample are left out, like a deque that is not full yet
+        if len(self._points) == 0:
+            return []
+        samples = np.array(self._points, dtype=np.float64)
+        timestamps = samples[:, 0]
+        points = samples[:, 1:]
+
+        grid = timestamps[-1] - self.interval * np.arange(
+            self.history_length - 1, -1, -1)
+        grid = grid[grid >= timestamps[0] - 1e-9]
+
+        right = np.minimum(np.searchsorted(timestamps, grid, side='left'),
+                           len(timestamps) - 1)
+        left = np.maximum(right - 1, 0)
+        span = timestamps[right] - timestamps[left]
+        weight = np.ones_like(grid)
+        np.divide(grid - timestamps[left], span, out=weight, where=span > 0)
+        weight = np.clip(weight, 0.0, 1.0)[:, None]
+
+        interpolated = points[left] + weight * (points[right] - points[left])
+        # Never blend a real point with a "no fingertip" marker, take the
+        # sample closest in time instead
+        valid = np.any(points != 0, axis=1)
+        nearest = np.where(weight < 0.5, points[left], points[right])
+        # A long gap means the fingertip was lost, not that it moved in a
+        # straight line
+        gap = span > self.max_gap + self.gap_tolerance
+        resampled = np.where((valid[left] & valid[right] & ~gap)[:, None],
+                             interpolated, nearest)
+        distance = np.minimum(grid - timestamps[left], timestamps[right] - grid)
+        resampled[gap & (distance > self.interval + 1e-9)] = 0
+
+        return np.rint(resampled).astype(int).tolist()
@@ -0,0 +1,170 @@
+import csv
+import time
+from collections import deque
+
+
+# Ordered from best quality to fastest. Capture size and inference size are
+# relative to the size requested on the command line.
+QUALITY_LEVELS = [
+    dict(capture_scale=1.0, inference_scale=1.0, model_complexity=1,
+         inference_stride=1, overlay_detail=2),
+    dict(capture_scale=1.0, inference_scale=0.75, model_complexity=1,
+         inference_stride=1, overlay_detail=2),
+    dict(capture_scale=1.0, inference_scale=0.75, model_complexity=0,
+         inference_stride=1, overlay_detail=1),
+    dict(capture_scale=0.75, inference_scale=0.5, model_complexity=0,
+         inference_stride=1, overlay_detail=1),
+    dict(capture_scale=0.75, inference_scale=0.5, model_complexity=0,
+         inference_stride=2, overlay_detail=0),
+    dict(capture_scale=0.5, inference_scale=0.5, model_complexity=0,
+         inference_stride=3, overlay_detail=0),
+]
+
+
+class QualityController(object):
+    def __init__(
+        self,
+        target_fps=None,
+        frame_budget_ms=None,
+        levels=QUALITY_LEVELS,
+        window=30,
+        degrade_ratio=1.0,
+        restore_ratio=0.7,
+        cooldown=2.0,
+        log_path=None,
+        max_decisions=1000,
+        wait_stages=('capture', ),
+    ):
+        if frame_budget_ms is None:
+            frame_budget_ms = 1000.0 / target_fps
+        self.frame_budget_ms = frame_budget_ms
+        self.levels = levels
+        self.window = window
+        # Degrade when the mean frame time is over budget * degrade_ratio,
+        # restore when it is under budget * restore_ratio (hysteresis)
+        self.degrade_ratio = degrade_ratio
+        self.restore_ratio = restore_ratio
+        self.cooldown = cooldown
+        # Time in these stages is spent waiting for the camera, not working.
+        # It is taken out of the frame time, otherwise a camera paced loop
+        # with target_fps at the camera rate always looks over budget
+        self.wait_stages = wait_stages
+
+        self.level = 0
+        # Latest decisions only, the full history goes to the log file
+        self.decisions = deque(maxlen=max_decisions)
+        self._frame_times = deque(maxlen=window)
+        self._stage_times = {}
+        self._last_frame = None
+        self._frame_wait_ms = 0.0
+        self._last_change = time.perf_counter()
+        # Grows each time a restore has to be undone, to stop flapping
+        self._restore_backoff = 1
+
+        self._log_file = None
+        self._log_writer = None
+        if log_path is not None:
+            self._log_file = open(log_path, 'a', newline="")
+            self._log_writer = csv.writer(self._log_file)
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def record(self, name, elapsed_ms):
+        if name in self.wait_stages:
+            self._frame_wait_ms += elapsed_ms
+        if name not in self._stage_times:
+            self._stage_times[name] = deque(maxlen=self.window)
+        self._stage_times[name].append(elapsed_ms)
+
+    def stage_means(self):
+        return {
+            name: sum(times) / len(times)
+            for name, times in self._stage_times.items() if len(times) > 0
+        }
+
+    def end_frame(self):
+        # Returns True when the quality level changed on this frame. Frame
+        # times are processing times, without the wait stages
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            self._frame_times.append(max(
+                (now - self._last_frame) * 1000.0 - self._frame_wait_ms, 0.0))
+        self._last_frame = now
+        self._frame_wait_ms = 0.0
+
+        if len(self._frame_times) < self.window:
+            return False
+        if now - self._last_change < self.cooldown:
+            return False
+
+        mean_frame_ms = sum(self._frame_times) / len(self._frame_times)
+        new_level = self.level
+        if (mean_frame_ms > self.frame_budget_ms * self.degrade_ratio
+                and self.level < len(self.levels) - 1):
+            new_level = self.level + 1
+        elif (mean_frame_ms < self.frame_budget_ms * self.restore_ratio
+              and self.level > 0
+              and now - self._last_change >=
+              self.cooldown * self._restore_backoff):
+            new_level = self.level - 1
+
+        if new_level == self.level:
+            return False
+
+        self._change_level(new_level, mean_frame_ms, now)
+        return True
+
+    def _change_level(self, new_level, mean_frame_ms, now):
+        decision = {
+            'time': time.time(),
+            'from_level': self.level,
+            'to_level': new_level,
+            'mean_frame_ms': round(mean_frame_ms, 2),
+            'budget_ms': round(self.frame_budget_ms, 2),
+            'stages': {
+                name: round(value, 2)
+                for name, value in self.stage_means().items()
+            },
+        }
+        if new_level > self.level:
+            last = self.decisions[-1] if len(self.decisions) > 0 else None
+            if (last is not None and last['from_level'] == new_level
+                    and last['to_level'] == self.level):
+                self._restore_backoff = min(self._restore_backoff * 2, 64)
+            else:
+                self._restore_backoff = 1
+        self.decisions.append(decision)
+        print(f"Quality level {self.level} -> {new_level} "
+              f"(processing {decision['mean_frame_ms']} ms, "
+              f"budget {decision['budget_ms']} ms, "
+              f"stages {decision['stages']})")
+        if self._log_writer is not None:
+            self._log_writer.writerow([
+                decision['time'], self.level, new_level,
+                decision['mean_frame_ms'], decision['budget_ms'],
+                *[f"{name}={value}"
+                  for name, value in decision['stages'].items()]
+            ])
+            self._log_file.flush()
+
+        self.level = new_level
+        self._last_change = now
+        # Measurements taken at the old level say nothing about the new one
+        self._frame_times.clear()
+        for times in self._stage_times.values():
+            times.clear()
+
+    def reset_timing(self):
+        # Gaps between frames while the loop is deliberately slowed down
+        # (idle mode) are not load and must not trigger a degrade
+        self._last_frame = None
+        self._frame_wait_ms = 0.0
+        self._frame_times.clear()
+
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+            self._log_writer = None